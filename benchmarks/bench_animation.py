@@ -0,0 +1,45 @@
+# Animation.update on many animated sprites, changing frame every update,
+# against switching frames the old way by drawing each sub-image into the
+# sprite's own surface.
+#
+#   python -m benchmarks.bench_animation
+import pygame
+from benchmarks.headless import get_engine, best_of
+
+animations = 500
+updates = 60
+walk_down = [(0, 0), (1, 0), (2, 0), (3, 0)]
+
+def run():
+    engine = get_engine()
+    from components.entity import Entity
+    from components.sprite import Animation
+
+    sprites = [Entity(Animation("player_sheet2.png", 32, 64, walk_down, 1)).get(Animation)
+               for _ in range(animations)]
+
+    def update_all():
+        for _ in range(updates):
+            for a in sprites:
+                a.update()
+
+    # How Atlas.switch_to used to work
+    sheet = sprites[0].base_image
+    surfaces = [pygame.Surface((32, 64), pygame.SRCALPHA) for _ in sprites]
+    def blit_all():
+        for tick in range(updates):
+            cell_x, cell_y = walk_down[tick % len(walk_down)]
+            for surface in surfaces:
+                surface.fill((0, 0, 0, 0))
+                surface.blit(sheet, (0, 0), pygame.Rect(cell_x * 32, cell_y * 64, 32, 64))
+
+    results = {
+        "update_us": best_of(update_all) / (updates * animations) * 1e6,
+        "blit_switch_us": best_of(blit_all) / (updates * animations) * 1e6,
+    }
+    engine.reset()
+    return results
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:<16} {value:8.3f}")
@@ -0,0 +1,109 @@
+# How long Area.load_file takes on each map in content/maps, with and
+# without the map file already in the area cache,
+# reading and writing the tiles of a big map, and loading a big map
+# in version 1 against the chunked version 2.
+# Also streams the chunked map's chunks out and back in, and checks that
+# it ends up with the same entities and sprites it started with.
+#
+#   python -m benchmarks.bench_area_load
+import io
+import os
+import random
+import shutil
+import struct
+import tempfile
+import core.area
+from core import area_cache
+from benchmarks.headless import load_area, best_of, quiet
+from core.area import map_folder_location
+from core.map import read_tiles, write_tiles, chunk_size
+from core.chunked_map import write_chunked_map
+
+repeats = 5
+big_map_size = 1000
+streamed_map_size = 500
+streamed_map_entities = 5000
+
+def run():
+    results = {}
+    for map_file in sorted(os.listdir(map_folder_location)):
+        if not map_file.endswith(".map"):
+            continue
+        area = load_area(map_file)
+        def load(cached):
+            if not cached:
+                area_cache.clear()
+            with quiet():
+                area.load_file(map_file)
+        results[f"{map_file}_ms"] = best_of(lambda: load(False), repeats=repeats) * 1000
+        results[f"{map_file}_cached_ms"] = best_of(lambda: load(True), repeats=repeats) * 1000
+
+    tiles = [[(x + y) % 8 for x in range(big_map_size)] for y in range(big_map_size)]
+    file = io.BytesIO()
+    def write():
+        file.seek(0)
+        write_tiles(file, tiles)
+    def read():
+        file.seek(0)
+        read_tiles(file, big_map_size, big_map_size)
+    name = f"tiles_{big_map_size}x{big_map_size}"
+    results[f"{name}_write_ms"] = best_of(write, repeats=repeats) * 1000
+    results[f"{name}_read_ms"] = best_of(read, repeats=repeats) * 1000
+
+    results.update(bench_streamed_map())
+    return results
+
+def bench_streamed_map():
+    rng = random.Random(1)
+    size = streamed_map_size
+    tiles = [[rng.choice([0, 0, 0, 1]) for _ in range(size)] for _ in range(size)]
+    entities = [(0, f"0,{size // 2},{size // 2}")] # The player
+    for index in range(1, streamed_map_entities):
+        if index % 10 == 0:
+            # Enemies, which hold a weapon sprite of their own
+            entities.append((index, f"9,{rng.randrange(size)},{rng.randrange(size)},npc_female2.png"))
+        else:
+            entities.append((index, f"1,{rng.randrange(size)},{rng.randrange(size)}")) # Pine trees
+
+    folder = tempfile.mkdtemp()
+    try:
+        with open(os.path.join(folder, "chunked.map"), "wb") as file:
+            write_chunked_map(file, tiles, entities, chunk_size)
+        with open(os.path.join(folder, "whole.map"), "wb") as file:
+            file.write(b'\0')
+            file.write(struct.pack('<3i', 1, size, size))
+            write_tiles(file, tiles)
+            file.write("".join(line + "\0" for _, line in entities).encode('utf-8'))
+
+        core.area.map_folder_location = folder
+        area = load_area("chunked.map")
+        results = {}
+        for map_file in ["whole.map", "chunked.map"]:
+            def load():
+                area_cache.clear()
+                with quiet():
+                    area.load_file(map_file)
+            results[f"{size}x{size}_{map_file}_ms"] = best_of(load, repeats=3) * 1000
+
+        # Walk off to a far corner of the map and back
+        from core.engine import engine
+        streamer = area.streamer
+        from components.player import Player
+        player = area.search_for_first(Player)
+        counts = (len(area.entities), len(engine.sprite_batch))
+        def stream_cycle():
+            with quiet():
+                streamer.stream_around(0, 0)
+                streamer.stream_around(player.x, player.y)
+        results[f"{size}x{size}_stream_cycle_ms"] = best_of(stream_cycle, repeats=3) * 1000
+        if (len(area.entities), len(engine.sprite_batch)) != counts:
+            raise AssertionError(f"Streaming out and back in went from {counts[0]} entities and {counts[1]} sprites "
+                                 f"to {len(area.entities)} and {len(engine.sprite_batch)}")
+        return results
+    finally:
+        core.area.map_folder_location = map_folder_location
+        shutil.rmtree(folder)
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:<28} {value:8.2f}")
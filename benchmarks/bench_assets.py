@@ -0,0 +1,47 @@
+# Loading every image in content/images by decoding the PNGs, against
+# reading the decoded pixels back from the disk cache, and drawing the
+# menu background with and without converting it for the window first.
+#
+#   python -m benchmarks.bench_assets
+import os
+import tempfile
+import pygame
+from benchmarks.headless import get_engine, best_of
+
+def run():
+    engine = get_engine()
+    from core import assets
+    filenames = [f for f in sorted(os.listdir(assets.image_path)) if f.endswith(".png")]
+
+    def decode_all():
+        for filename in filenames:
+            pygame.image.load(assets.image_path + "/" + filename)
+
+    # Use a cache of our own, so the game's isn't touched
+    folder = tempfile.mkdtemp()
+    game_cache_folder = assets.cache_folder
+    assets.cache_folder = folder
+    for filename in filenames:
+        assets.load(filename)
+    def read_cached_all():
+        for filename in filenames:
+            assets.load(filename)
+
+    results = {
+        "decode_all_ms": best_of(decode_all) * 1000,
+        "cached_all_ms": best_of(read_cached_all) * 1000,
+    }
+    for cached in os.listdir(folder):
+        os.remove(os.path.join(folder, cached))
+    os.rmdir(folder)
+    assets.cache_folder = game_cache_folder
+
+    unconverted = pygame.image.load(assets.image_path + "/main_menu.png")
+    converted = unconverted.convert_alpha()
+    results["blit_menu_unconverted_ms"] = best_of(lambda: engine.screen.blit(unconverted, (0, 0)), number=20) * 1000
+    results["blit_menu_converted_ms"] = best_of(lambda: engine.screen.blit(converted, (0, 0)), number=20) * 1000
+    return results
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:<26} {value:8.2f}")
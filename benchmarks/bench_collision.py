@@ -0,0 +1,50 @@
+# Collision checks: Map.is_rect_solid, and Body.is_position_valid
+# with more and more bodies in the area.
+#
+#   python -m benchmarks.bench_collision
+import random
+from benchmarks.headless import load_area, best_of
+
+rect_checks = 20000
+body_counts = [10, 100, 1000]
+checks_per_run = 5000 # How many is_position_valid calls each timed run makes at least
+
+def bench_is_rect_solid():
+    area = load_area("forest_west.map")
+    world_width = area.map.width * area.map.tile_size
+    world_height = area.map.height * area.map.tile_size
+    rng = random.Random(1)
+    rects = [(rng.uniform(-32, world_width), rng.uniform(-32, world_height), 16, 16)
+             for _ in range(rect_checks)]
+    is_rect_solid = area.map.is_rect_solid
+    def check_all():
+        for r in rects:
+            is_rect_solid(*r)
+    return best_of(check_all, repeats=7) / rect_checks
+
+def bench_is_position_valid(count):
+    from components.entity import Entity
+    from components.physics import Body
+    area = load_area("template.map")
+    world_width = area.map.width * area.map.tile_size
+    world_height = area.map.height * area.map.tile_size
+    rng = random.Random(count)
+    bodies = []
+    for _ in range(count):
+        e = Entity(x=rng.uniform(0, world_width - 32), y=rng.uniform(0, world_height - 32))
+        e.add(Body())
+        bodies.append(e.get(Body))
+    def check_all():
+        for b in bodies:
+            b.is_position_valid()
+    return best_of(check_all, number=max(1, checks_per_run // count), repeats=7) / count
+
+def run():
+    results = {"is_rect_solid_ns": bench_is_rect_solid() * 1e9}
+    for count in body_counts:
+        results[f"is_position_valid_{count}_bodies_us"] = bench_is_position_valid(count) * 1e6
+    return results
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:<36} {value:8.2f}")
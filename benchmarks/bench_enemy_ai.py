@@ -0,0 +1,35 @@
+# Enemy.update_ai, which looks around for the player, with many enemies in the area.
+#
+#   python -m benchmarks.bench_enemy_ai
+import random
+from benchmarks.headless import load_area, best_of, quiet
+
+enemy_counts = [10, 100, 500]
+calls_per_run = 2000 # How many update_ai calls each timed run makes at least
+
+def bench_update_ai(count):
+    area = load_area("template.map")
+    from data.objects import create_entity
+    from components.enemy import Enemy
+    rng = random.Random(count)
+    enemies = []
+    with quiet():
+        for _ in range(count):
+            e = create_entity(9, rng.randint(1, area.map.width - 2), rng.randint(1, area.map.height - 3),
+                              ["npc_female2.png"])
+            area.add_entity(e)
+            enemies.append(e.get(Enemy))
+    def think_all():
+        for enemy in enemies:
+            enemy.update_ai()
+    return best_of(think_all, number=max(1, calls_per_run // count), repeats=7) / count
+
+def run():
+    results = {}
+    for count in enemy_counts:
+        results[f"update_ai_{count}_enemies_us"] = bench_update_ai(count) * 1e6
+    return results
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:<30} {value:8.2f}")
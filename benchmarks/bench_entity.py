@@ -0,0 +1,54 @@
+# Compares Entity.get/has against the old linear isinstance scan.
+#
+# Run from the project folder:
+#   python -m benchmarks.bench_entity
+from timeit import timeit
+from components.entity import Entity
+
+iterations = 200000
+
+# Stand-ins for components, shaped like the ones on a Player entity:
+# Player, Animation (-> Atlas -> Sprite), Body, Combat
+class Sprite: pass
+class Atlas(Sprite): pass
+class Animation(Atlas): pass
+class Player: pass
+class Body: pass
+class Combat: pass
+class Enemy: pass
+
+def scan_get(entity, kind):
+    # How Entity.get used to work
+    for c in entity.components:
+        if isinstance(c, kind):
+            return c
+    return None
+
+def scan_has(entity, kind):
+    for c in entity.components:
+        if isinstance(c, kind):
+            return True
+    return False
+
+def run():
+    e = Entity(Player(), Animation(), Body(), Combat())
+    cases = [
+        ("get(Sprite)",  lambda: scan_get(e, Sprite), lambda: e.get(Sprite)),
+        ("get(Combat)",  lambda: scan_get(e, Combat), lambda: e.get(Combat)),
+        ("has(Combat)",  lambda: scan_has(e, Combat), lambda: e.has(Combat)),
+        ("has(Enemy)",   lambda: scan_has(e, Enemy),  lambda: e.has(Enemy)),
+    ]
+    results = {}
+    for name, scan, indexed in cases:
+        scan_time = timeit(scan, number=iterations)
+        indexed_time = timeit(indexed, number=iterations)
+        results[name] = {
+            "scan_ns": scan_time / iterations * 1e9,
+            "indexed_ns": indexed_time / iterations * 1e9,
+        }
+    return results
+
+if __name__ == "__main__":
+    for name, r in run().items():
+        print(f"{name:<12} scan {r['scan_ns']:7.1f} ns   indexed {r['indexed_ns']:7.1f} ns   "
+              f"{r['scan_ns']/r['indexed_ns']:4.1f}x")
@@ -0,0 +1,33 @@
+# Inventory.add and Inventory.remove on a half full inventory.
+#
+#   python -m benchmarks.bench_inventory
+from benchmarks.headless import get_engine, best_of
+
+capacity = 32
+cycles = 10000
+
+def run():
+    get_engine()
+    from components.inventory import Inventory
+    from data.item_types import item_types
+    diamond, axe, pickaxe = item_types[0], item_types[1], item_types[2]
+
+    inventory = Inventory(capacity)
+    for _ in range(capacity // 2):
+        inventory.add(axe)
+
+    def add_remove(item_type, amount):
+        def cycle():
+            for _ in range(cycles):
+                inventory.add(item_type, amount)
+                inventory.remove(item_type, amount)
+        return cycle
+
+    return {
+        "add_remove_stacked_ns": best_of(add_remove(diamond, 3)) / cycles * 1e9,
+        "add_remove_single_ns": best_of(add_remove(pickaxe, 1)) / cycles * 1e9,
+    }
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:<24} {value:8.1f}")
@@ -0,0 +1,52 @@
+# Label.set_text as the player walks, with the text changing every call,
+# for rendered labels and glyph labels, against rendering it every time
+# like Label used to. Also setting the same text again, which does nothing.
+#
+#   python -m benchmarks.bench_label
+from benchmarks.headless import get_engine, best_of
+
+calls = 2000
+font = "EBGaramond-Regular.ttf"
+
+def run():
+    engine = get_engine()
+    from components.entity import Entity
+    from components.label import Label, anti_alias
+    texts = [f"X: {x} - Y: {x // 3}" for x in range(calls)]
+
+    rendered = Entity(Label(font, "")).get(Label)
+    glyph = Entity(Label(font, "", glyphs=True)).get(Label)
+
+    def set_all(label):
+        def cycle():
+            for text in texts:
+                label.set_text(text)
+        return cycle
+
+    def set_same():
+        for _ in range(calls):
+            rendered.set_text(texts[0])
+
+    # How Label.set_text used to work
+    def render_all():
+        for text in texts:
+            rendered.font.render(text, anti_alias, rendered.color)
+            rendered.font.render(text, anti_alias, (0, 0, 0))
+
+    def draw(label):
+        return lambda: label.draw(engine.screen)
+
+    results = {
+        "render_us": best_of(render_all) / calls * 1e6,
+        "set_text_us": best_of(set_all(rendered)) / calls * 1e6,
+        "set_text_glyphs_us": best_of(set_all(glyph)) / calls * 1e6,
+        "set_text_unchanged_us": best_of(set_same) / calls * 1e6,
+        "draw_us": best_of(draw(rendered), number=calls) * 1e6,
+        "draw_glyphs_us": best_of(draw(glyph), number=calls) * 1e6,
+    }
+    engine.reset()
+    return results
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:<24} {value:8.2f}")
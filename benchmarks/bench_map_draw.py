@@ -0,0 +1,35 @@
+# What drawing the tile map costs per frame, while the camera pans across it.
+# "cold" throws the cached chunks away every frame, "warm" keeps them.
+#
+#   python -m benchmarks.bench_map_draw
+from benchmarks.headless import get_engine, load_area, best_of
+from core.camera import camera
+
+frames = 120
+
+def run():
+    engine = get_engine()
+    area = load_area("forest_west.map")
+    world_width = area.map.width * area.map.tile_size
+    world_height = area.map.height * area.map.tile_size
+    # A diagonal pan over the whole map
+    positions = [(int((world_width - camera.width) * i / frames),
+                  int((world_height - camera.height) * i / frames)) for i in range(frames)]
+
+    def pan(cold):
+        for x, y in positions:
+            camera.x, camera.y = x, y
+            if cold:
+                area.map.chunks.clear()
+            area.map.draw(engine.screen)
+
+    results = {
+        "draw_warm_ms": best_of(lambda: pan(False)) / frames * 1000,
+        "draw_cold_ms": best_of(lambda: pan(True), repeats=3) / frames * 1000,
+    }
+    camera.x, camera.y = 0, 0
+    return results
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:<16} {value:8.3f}")
@@ -0,0 +1,60 @@
+# Working out which sprites to draw and in what order, with the sprites kept
+# sorted by layer and y as they move, against sorting every sprite by y each
+# frame. A tenth of the sprites move every frame.
+#
+# It is run on a square world, and on a wide one that is only a few screens
+# tall, where a band of rows across the whole map holds most of the sprites.
+#
+#   python -m benchmarks.bench_render_queue
+import random
+from benchmarks.headless import get_engine, best_of
+from core.camera import camera
+
+sprite_counts = [100, 1000, 10000]
+worlds = {"square": (200 * 32, 200 * 32), "wide": (2000 * 32, 40 * 32)} # name -> width, height in pixels
+frames = 60
+
+def run():
+    engine = get_engine()
+    from components.entity import Entity
+    from components.sprite import Sprite
+    from core.render import layers
+    random.seed(1)
+    results = {}
+    for world, (world_width, world_height) in worlds.items():
+        for count in sprite_counts:
+            engine.reset()
+            batch = engine.sprite_batch
+            sprites = [Entity(Sprite("tree.png", layer=random.choice(layers)),
+                              x=random.randrange(world_width), y=random.randrange(world_height)).get(Sprite)
+                       for _ in range(count)]
+            moving = sprites[::10]
+            for sprite in moving:
+                sprite.set_dynamic()
+            positions = [(world_width // 2 + i * 8, world_height // 2 + i * 4) for i in range(frames)]
+
+            def frame(get_visible):
+                def pan():
+                    for x, y in positions:
+                        camera.x, camera.y = x, y
+                        for sprite in moving:
+                            sprite.entity.y += 1
+                        get_visible()
+                return pan
+
+            def sort_all():
+                ordered = sorted(sprites, key=lambda s: (s.layer, s.entity.y + s.height + s.depth_offset, batch.order[s]))
+                return [s for s in ordered
+                        if s.entity.x < camera.right and s.entity.x + s.width > camera.x and
+                           s.entity.y < camera.bottom and s.entity.y + s.height > camera.y]
+
+            results[f"{world}_queue_{count}_ms"] = best_of(frame(batch.get_visible)) / frames * 1000
+            results[f"{world}_sort_all_{count}_ms"] = best_of(frame(sort_all)) / frames * 1000
+
+    engine.reset()
+    camera.x, camera.y = 0, 0
+    return results
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:<28} {value:8.3f}")
@@ -0,0 +1,55 @@
+# Saving and loading a game, by how many changes were made to the world.
+# The changes are spread over areas_changed areas, and saved to a
+# temporary file instead of the real save.
+#
+#   python -m benchmarks.bench_save_game
+import os
+import tempfile
+from benchmarks.headless import best_of
+
+world_sizes = [100, 10000, 100000]
+areas_changed = 10
+
+def make_save(changes):
+    from core import world_state
+    from core.save_game import SaveData
+    deltas = {}
+    for i in range(changes):
+        area_deltas = deltas.setdefault(f"area_{i % areas_changed}.map", {})
+        area_deltas[i] = {world_state.removed: 0} if i % 2 else {world_state.quantity: i % 50}
+    slots = [(i % 3, 1) for i in range(20)]
+    return SaveData("forest.map", 100.0, 200.0, 80.0, 20, 0, slots, deltas)
+
+def run():
+    from core import save_game
+    folder = tempfile.mkdtemp()
+    save_game.save_path = os.path.join(folder, "save.dat")
+
+    results = {}
+    for changes in world_sizes:
+        save = make_save(changes)
+        revisioned = {area_file: (0, deltas) for area_file, deltas in save.deltas.items()}
+
+        def save_all():
+            save.deltas = dict(revisioned)
+            save_game.write_snapshot(save)
+
+        # After one area changed, the others reuse the bytes from the last save
+        def save_one_changed():
+            save.deltas = {area_file: save_game.encoded_areas[area_file][1] for area_file in revisioned}
+            first = next(iter(revisioned))
+            save.deltas[first] = revisioned[first]
+            save_game.write_snapshot(save)
+
+        results[f"save_{changes}_ms"] = best_of(save_all) * 1000
+        results[f"save_{changes}_one_changed_ms"] = best_of(save_one_changed) * 1000
+        results[f"load_{changes}_ms"] = best_of(save_game.read_save) * 1000
+        save_game.encoded_areas.clear()
+
+    os.remove(save_game.save_path)
+    os.rmdir(folder)
+    return results
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:<30} {value:8.2f}")
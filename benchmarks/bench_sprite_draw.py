@@ -0,0 +1,51 @@
+# Drawing the world's sprites each frame with the SpriteBatch, against
+# calling Sprite.draw on every one of them like the engine used to, with
+# the sprites spread over a world of 200x200 tiles and a tenth of them moving.
+#
+#   python -m benchmarks.bench_sprite_draw
+import random
+from benchmarks.headless import get_engine, best_of
+from core.camera import camera
+
+sprite_counts = [100, 1000, 10000]
+world_size = 200 * 32
+frames = 60
+
+def run():
+    engine = get_engine()
+    from components.entity import Entity
+    from components.sprite import Sprite
+    random.seed(1)
+    results = {}
+    for count in sprite_counts:
+        engine.reset()
+        sprites = [Entity(Sprite("tree.png"), x=random.randrange(world_size), y=random.randrange(world_size)).get(Sprite)
+                   for _ in range(count)]
+        moving = sprites[::10]
+        for sprite in moving:
+            sprite.set_dynamic()
+        positions = [(world_size // 2 + i * 8, world_size // 2 + i * 4) for i in range(frames)]
+
+        def frame(draw):
+            def pan():
+                for x, y in positions:
+                    camera.x, camera.y = x, y
+                    for sprite in moving:
+                        sprite.entity.x += 1
+                    draw()
+            return pan
+
+        def draw_each():
+            for sprite in sprites:
+                sprite.draw(engine.screen)
+
+        results[f"batch_{count}_ms"] = best_of(frame(lambda: engine.sprite_batch.draw(engine.screen))) / frames * 1000
+        results[f"each_{count}_ms"] = best_of(frame(draw_each)) / frames * 1000
+
+    engine.reset()
+    camera.x, camera.y = 0, 0
+    return results
+
+if __name__ == "__main__":
+    for name, value in run().items():
+        print(f"{name:<18} {value:8.3f}")
@@ -0,0 +1,47 @@
+# Shared setup for the benchmarks that need the game itself running.
+# Importing this starts the engine headless, so no window is opened.
+import os
+import io
+import time
+import contextlib
+
+os.environ.setdefault("GAME_HEADLESS", "1")
+
+# Content is loaded with paths relative to the project folder
+project_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(project_folder)
+
+import core.engine # Initializes pygame, which loading images and sounds needs
+
+def get_engine():
+    if core.engine.engine is None:
+        # Loading maps with NPCs shouldn't start building agents
+        import components.npc
+        components.npc.prewarm_agents = False
+        core.engine.Engine("Benchmarks")
+    return core.engine.engine
+
+# Keeps the prints done while loading maps out of the results
+def quiet():
+    return contextlib.redirect_stdout(io.StringIO())
+
+def load_area(map_file):
+    from core.area import Area
+    from data.tile_types import tile_kinds
+    get_engine()
+    with quiet():
+        return Area(map_file, tile_kinds)
+
+# Runs func number times in a row, repeats times over, and returns
+# the seconds per call of the fastest run. The fastest run is the one
+# least disturbed by whatever else the machine was doing.
+def best_of(func, number=1, repeats=5):
+    best = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        took = (time.perf_counter() - started) / number
+        if best is None or took < best:
+            best = took
+    return best
@@ -0,0 +1,124 @@
+# Runs the benchmarks headless and writes the results as JSON.
+#
+# Run from the project folder:
+#   python -m benchmarks.run                   Run everything, save to benchmarks/results.json
+#   python -m benchmarks.run collision         Only run some of the benchmarks
+#   python -m benchmarks.run --save-baseline   Also keep the results as the baseline
+#   python -m benchmarks.run --compare         Compare against the baseline, and exit
+#                                              with 1 if anything got slower
+#
+# Every result is a time per call (ending in _ms, _us or _ns), so lower is better.
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import importlib
+
+benchmark_folder = os.path.dirname(os.path.abspath(__file__))
+results_path = os.path.join(benchmark_folder, "results.json")
+baseline_path = os.path.join(benchmark_folder, "baseline.json")
+
+benchmarks = [
+    "entity",
+    "area_load",
+    "collision",
+    "map_draw",
+    "enemy_ai",
+    "inventory",
+    "save_game",
+    "animation",
+    "assets",
+    "label",
+    "sprite_draw",
+    "render_queue",
+]
+
+# How much slower than the baseline a result can be before it counts as a regression
+regression_threshold = 0.15
+
+def flatten(results, prefix=""):
+    # bench_entity returns {case: {metric: value}}, the rest return {metric: value}
+    flat = {}
+    for name, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{name}."))
+        else:
+            flat[prefix + name] = value
+    return flat
+
+def run_benchmarks(names):
+    results = {}
+    for name in names:
+        print(f"Running {name}...", flush=True)
+        module = importlib.import_module(f"benchmarks.bench_{name}")
+        started = time.perf_counter()
+        results[name] = flatten(module.run())
+        print(f"  done in {time.perf_counter() - started:.1f}s")
+    return results
+
+def compare(results, baseline, threshold=regression_threshold):
+    regressions = []
+    print(f"\n{'benchmark':<50}{'baseline':>12}{'now':>12}{'change':>9}")
+    for bench, metrics in results.items():
+        for metric, value in metrics.items():
+            before = baseline.get(bench, {}).get(metric)
+            name = f"{bench}.{metric}"
+            if not before:
+                print(f"{name:<50}{'-':>12}{value:12.3f}{'new':>9}")
+                continue
+            change = value / before - 1
+            flag = ""
+            if change > threshold:
+                flag = "  SLOWER"
+                regressions.append(name)
+            print(f"{name:<50}{before:12.3f}{value:12.3f}{change:+8.0%}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the game's benchmarks")
+    parser.add_argument("names", nargs="*", metavar="name",
+                        help=f"benchmarks to run, out of: {', '.join(benchmarks)}")
+    parser.add_argument("--output", default=results_path, help="where to write the results")
+    parser.add_argument("--save-baseline", action="store_true", help="also save the results as the baseline")
+    parser.add_argument("--compare", action="store_true", help="compare the results against the baseline")
+    parser.add_argument("--baseline", default=baseline_path, help="the baseline file to save or compare against")
+    parser.add_argument("--threshold", type=float, default=regression_threshold,
+                        help="how much slower counts as a regression, 0.15 is 15%% slower")
+    args = parser.parse_args()
+    for name in args.names:
+        if name not in benchmarks:
+            parser.error(f"unknown benchmark {name}, choose from: {', '.join(benchmarks)}")
+
+    results = run_benchmarks(args.names or benchmarks)
+    report = {
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "results": results,
+    }
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"No baseline at {args.baseline}, run with --save-baseline first")
+            sys.exit(1)
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmarks are more than {args.threshold:.0%} slower than the baseline")
+            sys.exit(1)
+        print("\nNo regressions")
+
+if __name__ == "__main__":
+    main()
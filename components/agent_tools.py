@@ -2,12 +2,21 @@ from langchain_community.tools import WikipediaQueryRun, DuckDuckGoSearchRun
 from langchain_community.utilities import WikipediaAPIWrapper
 from langchain.tools import Tool
 from datetime import datetime
+from contextvars import ContextVar
 
 
-search = DuckDuckGoSearchRun()
+# Made the first time a search is done, it is slow to set up
+search = None
+
+def run_search(query: str) -> str:
+    global search
+    if search is None:
+        search = DuckDuckGoSearchRun()
+    return search.run(query)
+
 search_tool = Tool(
     name ="search",
-    func=search.run,
+    func=run_search,
     description="Search the web for information. Use this when asked for \
         recent information like game result, weather, game information \
         and recent releases."
@@ -104,32 +113,28 @@ neighbor_tool = Tool(
 )
 
 
+# What the tree tool knows about the area, taken on the main thread before each
+# request to the agent (see DialogueView.get_tree_snapshot). The tool runs on the
+# agent's background thread, where reading the area while the game changes it isn't safe.
+# NPCAgent.run sets it for just the request it is given, so requests running
+# at the same time each see their own.
+# {"trees": [(x, y, is_chopped) in tiles], "map_width": tiles, "map_height": tiles}
+tree_snapshot = ContextVar("tree_snapshot", default=None)
+
 def get_forest_tree_information(query: str = "") -> str:
     """
     Provides information about tree distribution across all quadrants of the forest
     in a single paragraph, using actual map boundaries from the loaded area.
     """
-    from core.area import area
-    from components.usable import Choppable
+    snapshot = tree_snapshot.get()
+    if snapshot is None:
+        return "There is no information about the trees in the forest."
 
-    
-    # Find all trees in the current map using the provided logic
-    chopped_trees = []
-    unchopped_trees = []
-    
-    for entity in area.entities:
-        for component in entity.components:
-            if isinstance(component, Choppable) and component.obj_name == "Pine Tree":
-                position = (int(entity.x / 32), int(entity.y / 32)+1)  # Convert to tile coordinates
-                
-                if component.is_chopped:
-                    chopped_trees.append(position)
-                else:
-                    unchopped_trees.append(position)
-    
+    chopped_trees = [(x, y) for x, y, is_chopped in snapshot["trees"] if is_chopped]
+    unchopped_trees = [(x, y) for x, y, is_chopped in snapshot["trees"] if not is_chopped]
 
-    map_width = len(area.map.tiles[0])-6  # Number of tiles horizontally
-    map_height = len(area.map.tiles)-3   # Number of tiles vertically
+    map_width = snapshot["map_width"]-6  # Number of tiles horizontally
+    map_height = snapshot["map_height"]-3   # Number of tiles vertically
     
     # Calculate mid-points based on actual map dimensions
     mid_x = map_width // 2
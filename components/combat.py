@@ -1,5 +1,7 @@
 from core.sound import Sound
 
+weapon_offset_y = 16 # How far down from its holder's top a weapon is drawn
+
 class Combat:
     def __init__(self, health, on_death):
         self.health = health
@@ -23,19 +25,30 @@ class Combat:
         if 'sound' in self.equipped.stats:
             self.sound = Sound(self.equipped.stats['sound'])
         self.weapon_sprite = Entity(Sprite(self.equipped.icon_name)).get(Sprite)
+        self.weapon_sprite.set_dynamic()
+        # Sort it just in front of whoever is holding it
+        holder = self.entity.get(Sprite)
+        if holder is not None:
+            self.weapon_sprite.depth_offset = holder.height - (weapon_offset_y + self.weapon_sprite.height) + 1
 
     def unequip(self):
         print("calling unequip")
         self.equipped = None    
-        self.weapon_sprite = None
+        self.remove_weapon_sprite()
         self.sound = None
         print("Weapon sprite", self.weapon_sprite)
             
 
+    # The weapon is an entity of its own, so it has to be deleted with its holder
+    def remove_weapon_sprite(self):
+        if self.weapon_sprite is not None:
+            self.weapon_sprite.entity.delete_self()
+            self.weapon_sprite = None
+
     def breakdown(self):
         from core.engine import engine
         engine.active_objs.remove(self)
-        self.weapon_sprite = None
+        self.remove_weapon_sprite()
 
     def attack(self, other):
         if self.equipped == None:
@@ -94,6 +107,6 @@ class Combat:
             
         if self.weapon_sprite is not None:
             self.weapon_sprite.entity.x = self.entity.x
-            self.weapon_sprite.entity.y = self.entity.y + 16
+            self.weapon_sprite.entity.y = self.entity.y + weapon_offset_y
         
 
@@ -22,6 +22,8 @@ class Enemy:
 
     def setup(self):
         from components.combat import Combat
+        from components.sprite import Sprite
+        self.entity.get(Sprite).set_dynamic()
         self.entity.add(Combat(self.health, on_enemy_death))
         self.combat = self.entity.get(Combat)
         self.combat.equip(self.weapon)
@@ -1,10 +1,17 @@
 
-
 class Entity:
+    __slots__ = ("components", "component_types", "x", "y", "index", "area")
+
     def __init__(self, *components, x=0, y=0):
         self.components = []
+        # Maps each component class, and every class it inherits from,
+        # to the first component of that kind. Lets get() and has() skip
+        # looking through every component.
+        self.component_types = {}
         self.x = x
         self.y = y
+        self.index = None
+        self.area = None # The area this entity was added to, if any
         for c in components:
             self.add(c, False)
         for c in components:
@@ -13,18 +20,23 @@ class Entity:
                 c.setup()
 
     def delete_self(self):
-        from core.area import area
-        if self in area.entities:
-            area.entities.remove(self)
+        if self.area is not None:
+            self.area.forget_entity(self)
         for c in self.components:
             g = getattr(c, "breakdown", None)
             if callable(g):
                 c.breakdown()
         self.components.clear()
+        self.component_types.clear()
 
     def add(self, component, perform_setup=True):
         component.entity = self
         self.components.append(component)
+        for kind in type(component).__mro__[:-1]: # Skip object
+            if kind not in self.component_types:
+                self.component_types[kind] = component
+        if self.area is not None:
+            self.area.index_component(self, component)
         if perform_setup:
             g = getattr(component, "setup", None)
             if callable(g):
@@ -41,15 +53,19 @@ class Entity:
                 c.breakdown()
             c.entity = None
             self.components.remove(c)
+            # Point anything that was pointing at c to the next component of that kind
+            for kind in type(c).__mro__[:-1]:
+                if self.component_types.get(kind) is c:
+                    del self.component_types[kind]
+                    for other in self.components:
+                        if isinstance(other, kind):
+                            self.component_types[kind] = other
+                            break
+            if self.area is not None:
+                self.area.unindex_component(self, c)
 
     def has(self, kind):
-        for c in self.components:
-            if isinstance(c, kind):
-                return True
-        return False
+        return kind in self.component_types
 
     def get(self, kind):
-        for c in self.components:
-            if isinstance(c, kind):
-                return c
-        return None    
+        return self.component_types.get(kind)
@@ -1,15 +1,12 @@
-import pygame
 from components.physics import Trigger
 from core.sound import Sound
 
-image_path = "content/images"
 pick_up_sound = Sound('pick_up.mp3')
 
 class ItemType:
     def __init__(self, name, icon, stack_size=1, **kwargs):
         self.name = name
         self.icon_name = icon
-        self.icon = pygame.image.load(image_path + "/" + icon)
         self.value = 0
         self.weight = 0
         self.stack_size = stack_size
@@ -17,6 +14,12 @@ class ItemType:
         for key in kwargs:
             self.stats[key] = kwargs[key]
 
+    # Item types are made before the window, so the icon is loaded once it is used
+    @property
+    def icon(self):
+        from core import assets
+        return assets.get_image(self.icon_name)
+
 class ItemSlot:
     def __init__(self):
         self.type = None
@@ -100,6 +103,13 @@ class Inventory:
                     return found
         return found
 
+    def clear(self):
+        for slot in self.slots:
+            slot.type = None
+            slot.amount = 0
+        self.equipped_slot = None
+        self.notify()
+
     def has(self, item_type, amount=1):
         found = 0
         for slot in self.slots:
@@ -148,12 +158,16 @@ def pick_up(item, other):
     from components.player import Player, inventory
     if other.has(Player):
         # inventory = other.get(Inventory)
+        quantity_before = item.quantity
         extra = inventory.add(item.item_type, item.quantity)
         pick_up_sound.play()
         item.quantity -= item.quantity - extra
         if item.quantity <= 0:
             from core.area import area
             area.remove_entity(item.entity)
+        elif extra != quantity_before:
+            from core import world_state
+            world_state.record(item.entity, world_state.quantity, item.quantity)
         # print(inventory)
             
 
@@ -1,22 +1,63 @@
 import pygame
+from collections import OrderedDict
 
 fonts = {}
 anti_alias = True
 
 font_folder_path = "content/fonts"
+shadow_color = (0, 0, 0)
+
+# Rendered text, shared by every label showing the same text in the same
+# font and color, so labels that are made over and over (like the amounts
+# in the inventory) don't render it again.
+# (font name, text, color) -> surface, least recently used first
+texts = OrderedDict()
+max_cached_texts = 256
+
+# Single characters, for labels made with glyphs=True. Those are drawn a
+# character at a time, so text that changes all the time, like numbers,
+# never has to be rendered at all.
+# (font name, character, color) -> surface
+glyphs = {}
+
+def render_text(font_name, font, text, color):
+    key = (font_name, text, color)
+    surface = texts.get(key)
+    if surface is not None:
+        texts.move_to_end(key)
+        return surface
+    surface = font.render(text, anti_alias, color)
+    texts[key] = surface
+    if len(texts) > max_cached_texts:
+        texts.popitem(last=False)
+    return surface
+
+def get_glyph(font_name, font, character, color):
+    key = (font_name, character, color)
+    surface = glyphs.get(key)
+    if surface is None:
+        surface = font.render(character, anti_alias, color)
+        glyphs[key] = surface
+    return surface
 
 class Label:
-    def __init__(self, font, text, size=32, color=(255, 255, 255)):
+    # glyphs - Draw the text a character at a time from cached characters, instead
+    #          of rendering it. For text that changes often. It ignores kerning,
+    #          so it suits numbers and short text best.
+    def __init__(self, font, text, size=32, color=(255, 255, 255), glyphs=False):
         from core.engine import engine
         global labels
         self.color = color
         name = font+str(size)
+        self.font_name = name
         if name in fonts:
             self.font = fonts[name]
         else:
             self.font = pygame.font.Font(font_folder_path + "/" + font, size)
             fonts[name] = self.font
 
+        self.glyphs = glyphs
+        self.rendered = None # The text and color last rendered
         self.set_text(text)
         engine.ui_drawables.append(self)
 
@@ -26,12 +67,42 @@ class Label:
 
     def set_text(self, text):
         self.text = text
-        self.surface = self.font.render(self.text, anti_alias, self.color)
-        self.shadow_surface = self.font.render(self.text, anti_alias, (0,0,0))
+        if self.rendered == (text, self.color):
+            return
+        self.rendered = (text, self.color)
+
+        if self.glyphs:
+            # Where each character goes, from the left of the label
+            self.glyph_run = []
+            self.shadow_run = []
+            x = 0
+            for character in text:
+                surface = get_glyph(self.font_name, self.font, character, self.color)
+                self.glyph_run.append((surface, x))
+                self.shadow_run.append((get_glyph(self.font_name, self.font, character, shadow_color), x))
+                x += surface.get_width()
+            self.text_width = x
+            self.glyph_blits = None
+            return
+
+        self.surface = render_text(self.font_name, self.font, text, self.color)
+        self.shadow_surface = render_text(self.font_name, self.font, text, shadow_color)
 
     def get_bounds(self):
+        if self.glyphs:
+            return pygame.Rect(0, 0, self.text_width, self.font.get_height())
         return pygame.Rect(0, 0, self.surface.get_width(), self.surface.get_height())
 
     def draw(self, screen):
+        if self.glyphs:
+            x = self.entity.x
+            y = self.entity.y
+            # Labels mostly stay put, so where every character goes is only worked out when they move
+            if self.glyph_blits is None or self.glyph_position != (x, y):
+                self.glyph_position = (x, y)
+                self.glyph_blits = [(surface, (x + offset + 1, y + 1)) for surface, offset in self.shadow_run] + \
+                                   [(surface, (x + offset, y)) for surface, offset in self.glyph_run]
+            screen.blits(self.glyph_blits, False)
+            return
         screen.blit(self.shadow_surface, (self.entity.x+1, self.entity.y+1))
         screen.blit(self.surface, (self.entity.x, self.entity.y))
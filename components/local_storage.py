@@ -1,62 +1,136 @@
 import os
 import pickle
 import json
+from collections import deque
 from langchain.memory import ChatMessageHistory
-from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.messages import HumanMessage, AIMessage, message_to_dict, messages_from_dict
+
+# Once a log has this many messages, older ones are dropped when it is compacted
+max_log_messages = 1000
+# How many appends between checks for whether a log needs compacting
+compact_every = 50
 
 class LocalChatStorage:
     """A replacement for RedisChatStorage that uses local files instead of Redis"""
-    
+
     def __init__(self, storage_dir='content/chat_data', character_name="nancy"):
         """Initialize local file storage"""
         self.storage_dir = storage_dir
         self.character_name = character_name
-        
+        self.appends_since_compact = 0
+
         # Create storage directory if it doesn't exist
         os.makedirs(self.storage_dir, exist_ok=True)
-    
+
     def _get_filepath(self, key):
         """Get the file path for a specific key"""
+        return os.path.join(self.storage_dir, f"{key}.jsonl")
+
+    def _get_legacy_filepath(self, key):
+        """Chats used to be pickled whole into one file per key"""
         return os.path.join(self.storage_dir, f"{key}.pkl")
-    
+
     def save_chat(self, key, chat_history):
         """
-        Save LangChain chat history to a local file
-        
+        Replace the whole chat log for a key with the given history
+
         Parameters:
             key (str): The key to store the chat under (e.g., 'nancy', 'albert')
             chat_history (ChatMessageHistory or list): LangChain chat history to save
         """
-        # Serialize the chat history
+        messages = chat_history.messages if hasattr(chat_history, "messages") else chat_history
         filepath = self._get_filepath(key)
-        
+
         try:
-            # Store in file
-            with open(filepath, 'wb') as f:
-                pickle.dump(chat_history, f)
+            # Write to a temporary file first so a crash can't leave half a log
+            with open(filepath + ".tmp", 'w', encoding='utf-8') as f:
+                for message in messages:
+                    f.write(json.dumps(message_to_dict(message)) + "\n")
+            os.replace(filepath + ".tmp", filepath)
             print(f"Chat saved under key: {key}")
         except Exception as e:
             print(f"Error saving chat: {e}")
-    
-    def load_chat(self, key):
+
+    def append_messages(self, key, messages):
+        """
+        Add new messages to the end of a chat log, without rewriting what is already there
+
+        Parameters:
+            key (str): The key the chat is stored under
+            messages (list): LangChain messages to add
+        """
+        if not messages:
+            return
+        filepath = self._get_filepath(key)
+
+        try:
+            with open(filepath, 'a', encoding='utf-8') as f:
+                for message in messages:
+                    f.write(json.dumps(message_to_dict(message)) + "\n")
+        except Exception as e:
+            print(f"Error saving chat: {e}")
+            return
+
+        self.appends_since_compact += 1
+        if self.appends_since_compact >= compact_every:
+            self.compact(key)
+
+    def compact(self, key, keep=None):
+        """Drop all but the newest messages from a chat log"""
+        self.appends_since_compact = 0
+        keep = max_log_messages if keep is None else keep
+        filepath = self._get_filepath(key)
+        if not os.path.exists(filepath):
+            return
+
+        with open(filepath, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
+        if len(lines) <= keep:
+            return
+        dropped = len(lines) - keep
+
+        with open(filepath + ".tmp", 'w', encoding='utf-8') as f:
+            f.writelines(lines[dropped:])
+        os.replace(filepath + ".tmp", filepath)
+
+        # The summary counts messages from the start of the log, which just moved
+        summary, summarized_messages = self.load_summary(key)
+        if summarized_messages:
+            self._write_summary(key, summary, max(0, summarized_messages - dropped))
+        print(f"Chat compacted for key: {key}")
+
+    def count_messages(self, key):
+        """How many messages are in a chat log"""
+        filepath = self._get_filepath(key)
+        if not os.path.exists(filepath):
+            return 0
+        with open(filepath, 'r', encoding='utf-8') as f:
+            return sum(1 for line in f if line.strip())
+
+    def load_chat(self, key, last=None):
         """
         Load chat history from a local file
-        
+
         Parameters:
             key (str): The key to retrieve the chat from
-            
+            last (int): Only load this many of the newest messages. Loads everything if None
+
         Returns:
             The chat history or a new empty ChatMessageHistory if not found
         """
         filepath = self._get_filepath(key)
-        
+
+        if not os.path.exists(filepath):
+            self._migrate_legacy_chat(key)
+
         if os.path.exists(filepath):
             try:
-                # Load the chat history from file
-                with open(filepath, 'rb') as f:
-                    chat_history = pickle.load(f)
+                # Only the lines we keep get parsed
+                with open(filepath, 'r', encoding='utf-8') as f:
+                    lines = deque(f, maxlen=last) if last is not None else f.readlines()
+                messages = messages_from_dict([json.loads(line) for line in lines if line.strip()])
                 print(f"Chat loaded from key: {key}")
-                return chat_history
+                return ChatMessageHistory(messages=messages)
             except Exception as e:
                 print(f"Error loading chat: {e}")
                 return ChatMessageHistory()
@@ -64,14 +138,71 @@ class LocalChatStorage:
             # Return a new chat history if none exists
             print(f"No existing chat found for key: {key}. Creating new chat history.")
             return ChatMessageHistory()
-    
+
+    def _migrate_legacy_chat(self, key):
+        """Turn an old pickled chat into a message log, if there is one"""
+        legacy_filepath = self._get_legacy_filepath(key)
+        if not os.path.exists(legacy_filepath):
+            return
+        try:
+            with open(legacy_filepath, 'rb') as f:
+                chat_history = pickle.load(f)
+            self.save_chat(key, chat_history)
+            print(f"Converted pickled chat for key: {key}")
+        except Exception as e:
+            print(f"Error converting pickled chat: {e}")
+
+    def _get_summary_filepath(self, key):
+        """The running summary of older messages is kept next to the log"""
+        return os.path.join(self.storage_dir, f"{key}.summary.json")
+
+    def save_summary(self, key, summary, unsummarized_messages=0):
+        """
+        Save the running summary of a chat's older messages
+
+        Parameters:
+            key (str): The key the chat is stored under
+            summary (str): The summary
+            unsummarized_messages (int): How many of the newest messages in the log aren't in the summary
+        """
+        summarized_messages = max(0, self.count_messages(key) - unsummarized_messages)
+        self._write_summary(key, summary, summarized_messages)
+
+    def _write_summary(self, key, summary, summarized_messages):
+        filepath = self._get_summary_filepath(key)
+        try:
+            with open(filepath + ".tmp", 'w', encoding='utf-8') as f:
+                json.dump({"summary": summary, "summarized_messages": summarized_messages}, f)
+            os.replace(filepath + ".tmp", filepath)
+        except Exception as e:
+            print(f"Error saving chat summary: {e}")
+
+    def load_summary(self, key):
+        """
+        Load the running summary of a chat's older messages
+
+        Returns:
+            The summary, or an empty string, and how many messages from the start of the log it covers
+        """
+        filepath = self._get_summary_filepath(key)
+        if not os.path.exists(filepath):
+            return "", 0
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data["summary"], data["summarized_messages"]
+        except Exception as e:
+            print(f"Error loading chat summary: {e}")
+            return "", 0
+
     def delete_chat(self, key):
         """Delete a chat history by key"""
-        filepath = self._get_filepath(key)
-        
-        if os.path.exists(filepath):
-            try:
-                os.remove(filepath)
-                print(f"Chat deleted for key: {key}")
-            except Exception as e:
-                print(f"Error deleting chat: {e}")
\ No newline at end of file
+        for filepath in [self._get_filepath(key), 
+                         self._get_legacy_filepath(key), 
+                         self._get_summary_filepath(key)]:
+            if os.path.exists(filepath):
+                try:
+                    os.remove(filepath)
+                    print(f"Chat deleted for key: {key}")
+                except Exception as e:
+                    print(f"Error deleting chat: {e}")
@@ -1,14 +1,31 @@
 from components.usable import Usable
-from components.npc_agent_db import NPCAgent
-from components.ui.dialogue_view import DialogueView
+from core.tasks import run_in_background
 
 npc_folder_location = "content/npcs"
 npc_talk_distance = 150
 
+# The agent code pulls in LangChain and OpenAI, which take seconds to import.
+# It is only imported on a background thread, or the first time an agent is needed.
+agent_stack_future = None
+
+def load_agent_stack():
+    import time
+    started = time.perf_counter()
+    import components.npc_agent_db
+    print(f"Loaded NPC agent stack in {time.perf_counter() - started:.2f}s")
+    return components.npc_agent_db
+
+def preload_agent_stack():
+    global agent_stack_future
+    if agent_stack_future is None:
+        agent_stack_future = run_in_background(load_agent_stack, name="npc-agent-import")
+    return agent_stack_future
+
 from components.usable import Usable
 
 npc_folder_location = "content/npcs"
 npc_talk_distance = 150
+prewarm_agents = True # Build NPC agents in the background when an area loads
 
 class static_NPC(Usable):
     def __init__(self, obj_name, npc_file):
@@ -46,6 +63,25 @@ class NPC(Usable):
         super().__init__(obj_name)
         self.npc_file = npc_file
 
+    def setup(self):
+        if prewarm_agents:
+            run_in_background(self.prewarm_agent, name="npc-agent-prewarm")
+
+    def prewarm_agent(self):
+        # Runs on a background thread, so the player doesn't wait for the agent later
+        try:
+            from components.npc_agent_db import get_agent
+            get_agent(self.obj_name)
+        except Exception as e:
+            print(f"Error prewarming agent for {self.obj_name}: {e}")
+
+    def record_greeting(self, lines):
+        try:
+            from components.npc_agent_db import get_agent
+            get_agent(self.obj_name).update_chat_history(lines)
+        except Exception as e:
+            print(f"Error initializing NPC dialogue: {e}")
+
     def on(self, other, distance):
         from components.player import Player
         player = other.get(Player)
@@ -54,15 +90,10 @@ class NPC(Usable):
         if distance < npc_talk_distance:
 
             lines = self.npc_conversation_dict[self.obj_name]
-            agent = NPCAgent(character_name = self.obj_name, model = "gpt-4o-mini")
-            query = ""
 
-            try:
-                agent.update_chat_history(lines)
-            
-            except Exception as e:
-                print(f"Error initializing NPC dialogue: {e}")
-                lines = [f"Hi, how can I help you?"]
+            # The agent is shared and may still be getting built,
+            # so don't hold up the game to save the greeting.
+            run_in_background(self.record_greeting, lines)
 
             from components.ui.dialogue_view import DialogueView
             DialogueView(lines, self, player)
@@ -1,17 +1,21 @@
 import os
 import time
+import threading
 from dotenv import load_dotenv
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from langchain.memory import ChatMessageHistory
 from langchain_core.output_parsers import PydanticOutputParser
 from langchain.agents import create_tool_calling_agent, AgentExecutor
 from openai import APIError
-from components.agent_tools import neighbor_tool, forest_tree_tool, search_tool
+from components.agent_tools import neighbor_tool, forest_tree_tool, search_tool, get_forest_tree_information, \
+    tree_snapshot
 from components.local_storage import LocalChatStorage
+from components.response_cache import ResponseCache
+from core.tasks import run_in_background
 
 try:
     import redis
@@ -24,6 +28,42 @@ except (ImportError, ModuleNotFoundError):
 
 load_dotenv()
 
+# How long a single request to the model can take before it is abandoned
+request_timeout_seconds = 20
+
+# The model every NPC talks with
+agent_model = "gpt-4o"
+
+# How many of the newest messages to load from storage when an agent is built
+history_load_limit = 100
+
+# How many of the latest turns (a player message and a reply) are sent to the model word for word.
+# Anything older is folded into a short running summary instead.
+history_window_turns = 6
+# How many turns past the window pile up before they get summarized
+summary_batch_turns = 4
+# Roughly how many tokens of history (summary included) to send with each query
+history_token_budget = 1500
+
+# Answers to common queries are reused instead of asking the model again.
+# Short queries like "yes" or "why?" depend on what was said before, so they are never cached.
+use_response_cache = True
+min_cached_query_words = 3
+response_cache = ResponseCache()
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count for budgeting history, without loading a tokenizer.
+    English text averages about 4 characters per token.
+    """
+    return len(text) // 4 + 1
+
+# One agent per character, built the first time it is needed and then reused
+agents = {}
+agent_build_locks = {} # Stops two threads from building the same character's agent
+agents_lock = threading.Lock()
+
 class AgentResponse(BaseModel):
     response: list 
     isSell: bool
@@ -39,6 +79,10 @@ class NPCAgent:
         self.character_name = character_name
         self.parser = PydanticOutputParser(pydantic_object=AgentResponse)
 
+        # Agents are shared between dialogues and used from background threads,
+        # so only one thing can run the agent or change its history at a time.
+        self.lock = threading.RLock()
+
         if REDIS_AVAILABLE:
             try:
                 self.chat_storage = RedisChatStorage(character_name=character_name)
@@ -52,10 +96,21 @@ class NPCAgent:
             print("Redis not available. Using local storage for chat history.")
             self.chat_storage = LocalChatStorage(character_name=character_name)
 
-        self.chat_history = self.chat_storage.load_chat(character_name)
+        self.chat_history = self.chat_storage.load_chat(character_name, last=history_load_limit)
+        # Messages before this are already in storage, only newer ones get appended
+        self.saved_message_count = len(self.chat_history.messages)
+
+        # Older turns live on in here instead of being sent word for word.
+        # The summary knows how many messages from the start of the log it covers,
+        # and only the newest history_load_limit were loaded, so work out how many
+        # of those are in it already. The rest get folded in once they are out of the window.
+        self.summary, summarized_messages = self.chat_storage.load_summary(character_name)
+        first_loaded = self.chat_storage.count_messages(character_name) - self.saved_message_count
+        self.summarized_count = min(self.saved_message_count, max(0, summarized_messages - first_loaded))
+        self.summarizing = False
 
         api_key = os.getenv("OPENAI_API_KEY")
-        self.llm = ChatOpenAI(model=model, api_key=api_key)
+        self.llm = ChatOpenAI(model=model, api_key=api_key, timeout=request_timeout_seconds)
         
         # Set up character-specific configurations
         self._configure_character()
@@ -74,6 +129,10 @@ class NPCAgent:
             verbose=True
         )
 
+        # Logs from before there were summaries, or that were saved before the last
+        # turns were folded in, get caught up now
+        self.summarize_if_needed()
+
     def _configure_character(self):
         """
         Configure the prompt and tools based on the character name.
@@ -195,39 +254,158 @@ class NPCAgent:
             ]
         ).partial(format_instructions=self.parser.get_format_instructions())
 
-    def run(self, query: str) -> Dict[str, Any]:
+    def run(self, query: str, cancel_event: Optional[threading.Event] = None, 
+            trees: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
         """
         Run the agent with the given query.
         
         Args:
             query: The user's query string
+            cancel_event: If given, stop retrying once it is set
+            trees: Snapshot of the area's trees for the tree tool, see agent_tools.tree_snapshot
             
         Returns:
-            Dict containing the raw response from the agent
+            Dict containing the raw response from the agent, or None if cancelled
         """
+        token = tree_snapshot.set(trees)
+        try:
+            return self._run_with_cache(query, cancel_event)
+        finally:
+            tree_snapshot.reset(token)
+
+    def _run_with_cache(self, query, cancel_event):
+        cache_key = self.get_cache_key(query)
+        if cache_key is not None:
+            output = response_cache.get(cache_key)
+            if output is not None:
+                print(f"Response cache hit for {self.character_name}: {response_cache.stats()}")
+                return {"query": query, "output": output}
+
+        with self.lock:
+            raw_response = self._run(query, cancel_event)
+
+        # Only keep answers that can actually be used
+        if cache_key is not None and raw_response is not None:
+            try:
+                self.parser.parse(raw_response.get("output"))
+                response_cache.put(cache_key, raw_response.get("output"))
+            except Exception:
+                pass
+        return raw_response
 
+    def get_cache_key(self, query: str) -> Optional[str]:
+        """
+        Key for looking up this query in the response cache, or None if it shouldn't be cached.
+        The key includes a digest of the world state this character's tools can see,
+        so answers about trees go stale once a tree is chopped.
+        """
+        if not use_response_cache or search_tool in self.tools:
+            # Web searches are about things that change, always ask
+            return None
+        if len(ResponseCache.normalize_query(query).split()) < min_cached_query_words:
+            return None
+
+        world_state = []
+        if forest_tree_tool in self.tools:
+            world_state.append(get_forest_tree_information())
+        return response_cache.make_key(self.character_name, query, 
+                                       ResponseCache.make_digest(*world_state))
+
+    def _run(self, query, cancel_event):
         max_retries = 3
         retry_delay = 1  # seconds
 
-        messages = self.chat_history.messages if hasattr(self.chat_history, "messages") else []
+        messages = self.get_history_messages()
         
         for attempt in range(max_retries):
+            if cancel_event is not None and cancel_event.is_set():
+                return None
             try:
                 return self.agent_executor.invoke({"chat_history": messages, "query": query})
             except APIError as e:
                 if attempt < max_retries - 1:
                     print(f"API Error: {e}. Retrying in {retry_delay} seconds...")
-                    time.sleep(retry_delay)
+                    if cancel_event is not None:
+                        # Wakes up early if the dialogue is closed
+                        if cancel_event.wait(retry_delay):
+                            return None
+                    else:
+                        time.sleep(retry_delay)
                     retry_delay *= 2  # Exponential backoff
                 else:
                     raise
         
-        messages = self.chat_history.messages if hasattr(self.chat_history, "messages") else []
+        messages = self.get_history_messages()
 
         print(f"This is from inside run{messages}")
 
         return self.agent_executor.invoke({"chat_history": messages, "query": query})
     
+    def get_history_messages(self) -> List[Any]:
+        """
+        The history to send with a query: the running summary, then as many of the
+        latest turns as fit in the window and the token budget.
+        """
+        messages = self.chat_history.messages if hasattr(self.chat_history, "messages") else []
+        messages = messages[self.summarized_count:][-history_window_turns * 2:]
+
+        history = []
+        budget = history_token_budget
+        if self.summary:
+            summary_message = SystemMessage(content=f"Summary of the earlier conversation: {self.summary}")
+            history.append(summary_message)
+            budget -= estimate_tokens(summary_message.content)
+
+        # Keep the newest messages that fit in the budget
+        kept = []
+        for message in reversed(messages):
+            budget -= estimate_tokens(str(message.content))
+            if budget < 0:
+                break
+            kept.append(message)
+        history.extend(reversed(kept))
+        return history
+
+    def summarize_older_turns(self):
+        """
+        Runs on a background thread. Folds the turns that have fallen out of the
+        window into the running summary, then drops them from memory.
+        """
+        try:
+            with self.lock:
+                end = len(self.chat_history.messages) - history_window_turns * 2
+                folding = self.chat_history.messages[self.summarized_count:end]
+                summary = self.summary
+            if not folding:
+                return
+
+            transcript = "\n".join(
+                f"{'Player' if isinstance(m, HumanMessage) else self.character_name}: {m.content}"
+                for m in folding
+            )
+            result = self.llm.invoke([
+                SystemMessage(content="You keep a short running summary of a conversation between "
+                                      f"a player and {self.character_name}, a character in a game. "
+                                      "Keep names, promises, purchases and anything the player told "
+                                      "about themselves. Reply with only the summary, under 100 words."),
+                HumanMessage(content=f"Current summary: {summary or 'None yet'}\n\n"
+                                     f"New conversation:\n{transcript}"),
+            ])
+
+            with self.lock:
+                self.summary = result.content
+                # Forget the messages that are summarized now, they are still in storage
+                folded = self.summarized_count + len(folding)
+                del self.chat_history.messages[:folded]
+                self.saved_message_count -= folded
+                self.summarized_count = 0
+                # Everything saved that is still in memory is newer than the summary
+                self.chat_storage.save_summary(self.character_name, self.summary, self.saved_message_count)
+        except Exception as e:
+            print(f"Error summarizing chat history: {e}")
+        finally:
+            self.summarizing = False
+
     def get_structured_response(self, raw_response: Dict[str, Any]) -> Optional[AgentResponse]:
         """
         Parse the raw response into a structured AgentResponse object.
@@ -247,11 +425,17 @@ class NPCAgent:
         This ensures proper formatting for OpenAI API.
         """
 
+        with self.lock:
+            self._update_chat_history(user_message, agent_response)
+
+    def _update_chat_history(self, user_message, agent_response):
         user_msg = user_message[0] if isinstance(user_message, list) and user_message else user_message
 
         # Initialize a new chat history if one doesn't exist
         if not hasattr(self.chat_history, "add_user_message"):
             self.chat_history = ChatMessageHistory()
+            self.saved_message_count = 0
+            self.summarized_count = 0
 
         if user_msg:
             self.chat_history.add_user_message(user_msg)
@@ -262,7 +446,41 @@ class NPCAgent:
             
             self.chat_history.add_ai_message(agent_msg)
         
-        self.chat_storage.save_chat(self.character_name, self.chat_history)
+        # Only write what was added since the last save
+        new_messages = self.chat_history.messages[self.saved_message_count:]
+        self.chat_storage.append_messages(self.character_name, new_messages)
+        self.saved_message_count = len(self.chat_history.messages)
+
+        self.summarize_if_needed()
+
+    def summarize_if_needed(self):
+        """Summarize old turns off the game loop once enough have fallen out of the window"""
+        unsummarized = len(self.chat_history.messages) - self.summarized_count
+        if not self.summarizing and \
+            unsummarized > (history_window_turns + summary_batch_turns) * 2:
+            self.summarizing = True
+            run_in_background(self.summarize_older_turns, name="npc-agent-summary")
+
+def get_agent(character_name: str, model: str = agent_model) -> NPCAgent:
+    """
+    Get the shared agent for a character, building it the first time it is asked for.
+    Building an agent is slow, so avoid calling this from the game loop unless it is prewarmed.
+    """
+    key = character_name.lower()
+    agent = agents.get(key)
+    if agent is not None:
+        return agent
+
+    with agents_lock:
+        build_lock = agent_build_locks.setdefault(key, threading.Lock())
+    with build_lock:
+        # Someone else may have finished building it while we waited
+        agent = agents.get(key)
+        if agent is None:
+            agent = NPCAgent(character_name=character_name, model=model)
+            agents[key] = agent
+    return agent
+
 
 # Example usage:
 if __name__ == "__main__":
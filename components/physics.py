@@ -1,24 +1,72 @@
 from pygame import Rect
+from core.spatial import SpatialHash
 
 bodies = []
 triggers = []
 
+# Bodies and triggers are also kept in a grid, so we only have to check
+# the ones close by instead of every one in the area.
+body_grid = SpatialHash()
+trigger_grid = SpatialHash()
+
+# Things can move a couple of pixels between refreshes (like when a move is
+# undone after is_position_valid), so objects are stored a little bigger
+# than they are to make sure they are still found.
+grid_padding = 4
+
+# The biggest hitbox so far. Circle checks are done from the corner of the
+# hitbox, so queries have to reach this far past the circle.
+largest_hitbox = 0
+
 def reset_physics():
     global bodies, triggers
     bodies.clear()
     triggers.clear()
+    body_grid.clear()
+    trigger_grid.clear()
+
+def refresh_physics(entity):
+    # Call after moving an entity without checking is_position_valid,
+    # so the grid knows where its body and triggers are now.
+    for c in entity.components:
+        if isinstance(c, PhysicalObj):
+            c.refresh()
 
 def get_bodies_within_circle(circle_x, circle_y, radius):
     items = []
-    for body in bodies:
+    for body in body_grid.query_circle(circle_x, circle_y, radius + largest_hitbox):
         if body.is_circle_colliding_with(circle_x, circle_y, radius):
             items.append(body)
     return items
 
+def get_triggers_colliding_with(obj):
+    x = obj.entity.x + obj.hitbox.x
+    y = obj.entity.y + obj.hitbox.y
+    items = []
+    for trigger in trigger_grid.query_rect(x, y, obj.hitbox.width, obj.hitbox.height):
+        if trigger.is_colliding_with(obj):
+            items.append(trigger)
+    return items
+
 
 class PhysicalObj:
+    grid = None # Which grid this kind of object is kept in
+
     def __init__(self, x, y, width, height):
+        global largest_hitbox
         self.hitbox = Rect(x, y, width, height)
+        largest_hitbox = max(largest_hitbox, width, height)
+
+    def setup(self):
+        self.refresh()
+
+    # Updates where this object is in the grid
+    def refresh(self):
+        self.grid.insert(self, 
+                         self.entity.x + self.hitbox.x - grid_padding, 
+                         self.entity.y + self.hitbox.y - grid_padding, 
+                         self.hitbox.width + grid_padding*2, 
+                         self.hitbox.height + grid_padding*2)
 
     def is_circle_colliding_with(self, circle_x, circle_y, radius):
         # Credit: https://stackoverflow.com/questions/401847/circle-rectangle-collision-detection-intersection
@@ -59,6 +107,8 @@ class PhysicalObj:
 
 
 class Trigger(PhysicalObj):
+    grid = trigger_grid
+
     def __init__(self, on, x=0, y=0, width=32, height=32):
         super().__init__(x, y, width, height)
         triggers.append(self)
@@ -67,12 +117,15 @@ class Trigger(PhysicalObj):
     def breakdown(self):
         global triggers
         triggers.remove(self)
+        trigger_grid.remove(self)
 
     # def __del__(self):
     #     triggers.remove(self)
 
 
 class Body(PhysicalObj):
+    grid = body_grid
+
     def __init__(self, x=0, y=0, width=32, height=32):
         super().__init__(x, y, width, height)
         bodies.append(self)
@@ -80,14 +133,17 @@ class Body(PhysicalObj):
     def breakdown(self):
         global bodies
         bodies.remove(self)
+        body_grid.remove(self)
 
     def is_position_valid(self):
         from core.area import area
+        # Anything that moves checks this, so it is a good time to update the grid
+        self.refresh()
         x = self.entity.x + self.hitbox.x
         y = self.entity.y + self.hitbox.y
         if area.map.is_rect_solid(x, y, self.hitbox.width, self.hitbox.height):
             return False
-        for body in bodies:
+        for body in body_grid.query_rect(x, y, self.hitbox.width, self.hitbox.height):
             if body != self and body.is_colliding_with(self):
                 return False
         return True
@@ -4,7 +4,7 @@ from core.input import is_key_pressed
 from core.camera import camera
 from components.entity import Entity
 from components.label import Label
-from components.physics import Body, triggers
+from components.physics import Body, get_triggers_colliding_with, trigger_grid
 from core.area import area
 from components.inventory import Inventory
 from components.ui.inventory_view import InventoryView
@@ -41,8 +41,10 @@ class Player:
 
         from core.engine import engine
         engine.active_objs.append(self)
+        # Changes whenever the player walks onto another tile, so it is drawn from cached characters
         self.loc_label = Entity(Label("EBGaramond-Regular.ttf", 
-                                         "X: 0 - Y: 0")).get(Label)
+                                         "X: 0 - Y: 0", glyphs=True)).get(Label)
+        self.shown_tile = None
         self.message_label = Entity(Label("EBGaramond-Regular.ttf", 
                                        area.name)).get(Label)
         self.inventory_window = Entity(InventoryView(inventory))
@@ -57,6 +59,7 @@ class Player:
 
     def setup(self):
         from components.combat import Combat
+        self.entity.get(Sprite).set_dynamic()
         combat = Combat(self.health, on_player_death)
         self.entity.add(combat)
         self.combat = combat
@@ -142,7 +145,10 @@ class Player:
             self.message_countdown -= 1
             if self.message_countdown <= 0:
                 self.message_label.set_text("")
-        self.loc_label.set_text(f"X: {int(self.entity.x/32)} - Y: {int(self.entity.y/32)}")
+        tile = (int(self.entity.x/32), int(self.entity.y/32))
+        if tile != self.shown_tile:
+            self.shown_tile = tile
+            self.loc_label.set_text(f"X: {tile[0]} - Y: {tile[1]}")
         previous_x = self.entity.x
         previous_y = self.entity.y
         sprite = self.entity.get(Sprite)
@@ -203,7 +209,8 @@ class Player:
         elif self.is_walking:
             self.stop_animation()
 
-        for t in triggers:
-            if body.is_colliding_with(t):
+        for t in get_triggers_colliding_with(body):
+            # An earlier trigger might have removed this one (like a teleport)
+            if t in trigger_grid:
                 t.on(self.entity)
 
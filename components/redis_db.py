@@ -1,54 +1,149 @@
 import redis
 import pickle
 from langchain.memory import ChatMessageHistory
-from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.messages import HumanMessage, AIMessage, message_to_dict, messages_from_dict
 import json
 
+# Once a log has this many messages, older ones are dropped when it is compacted
+max_log_messages = 1000
+# How many appends between checks for whether a log needs compacting
+compact_every = 50
+
 class RedisChatStorage:
     def __init__(self, host='localhost', port=6379, db=0, character_name = "nancy"):
         """Initialize Redis connection"""
         self.redis_client = redis.Redis(host=host, port=port, db=db)
         self.character_name = character_name
-    
+        self.appends_since_compact = 0
+
+    def _get_log_key(self, key):
+        """Messages are kept in a Redis list, one JSON message per item"""
+        return f"{key}:messages"
+
     def save_chat(self, key, chat_history):
         """
-        Save LangChain chat history to Redis
-        
+        Replace the whole chat log for a key with the given history
+
         Parameters:
             key (str): The key to store the chat under (e.g., 'nancy', 'albert')
             chat_history (ChatMessageHistory or list): LangChain chat history to save
         """
-        # Serialize the chat history
-        serialized_chat = pickle.dumps(chat_history)
-        
-        # Store in Redis
-        self.redis_client.set(key, serialized_chat)
+        messages = chat_history.messages if hasattr(chat_history, "messages") else chat_history
+        log_key = self._get_log_key(key)
+
+        # Swap the whole list in one go
+        pipe = self.redis_client.pipeline()
+        pipe.delete(log_key)
+        if messages:
+            pipe.rpush(log_key, *[json.dumps(message_to_dict(m)) for m in messages])
+        pipe.execute()
         print(f"Chat saved under key: {key}")
-    
-    def load_chat(self, key):
+
+    def append_messages(self, key, messages):
+        """
+        Add new messages to the end of a chat log, without rewriting what is already there
+
+        Parameters:
+            key (str): The key the chat is stored under
+            messages (list): LangChain messages to add
+        """
+        if not messages:
+            return
+        self.redis_client.rpush(self._get_log_key(key),
+                                *[json.dumps(message_to_dict(m)) for m in messages])
+
+        self.appends_since_compact += 1
+        if self.appends_since_compact >= compact_every:
+            self.compact(key)
+
+    def compact(self, key, keep=None):
+        """Drop all but the newest messages from a chat log"""
+        self.appends_since_compact = 0
+        keep = max_log_messages if keep is None else keep
+        log_key = self._get_log_key(key)
+        dropped = self.redis_client.llen(log_key) - keep
+        if dropped <= 0:
+            return
+        self.redis_client.ltrim(log_key, -keep, -1)
+
+        # The summary counts messages from the start of the log, which just moved
+        summary, summarized_messages = self.load_summary(key)
+        if summarized_messages:
+            self._write_summary(key, summary, max(0, summarized_messages - dropped))
+
+    def count_messages(self, key):
+        """How many messages are in a chat log"""
+        return self.redis_client.llen(self._get_log_key(key))
+
+    def load_chat(self, key, last=None):
         """
         Load chat history from Redis
-        
+
         Parameters:
             key (str): The key to retrieve the chat from
-            
+            last (int): Only load this many of the newest messages. Loads everything if None
+
         Returns:
             The chat history or a new empty ChatMessageHistory if not found
         """
-        # Try to get the chat history from Redis
-        serialized_chat = self.redis_client.get(key)
-        
-        if serialized_chat:
-            # Deserialize the chat history
-            chat_history = pickle.loads(serialized_chat)
+        log_key = self._get_log_key(key)
+        if not self.redis_client.exists(log_key):
+            self._migrate_legacy_chat(key)
+
+        start = -last if last is not None else 0
+        items = self.redis_client.lrange(log_key, start, -1) if last != 0 else []
+
+        if items:
+            messages = messages_from_dict([json.loads(item) for item in items])
             print(f"Chat loaded from key: {key}")
-            return chat_history
+            return ChatMessageHistory(messages=messages)
         else:
             # Return a new chat history if none exists
             print(f"No existing chat found for key: {key}. Creating new chat history.")
             return ChatMessageHistory()
-    
+
+    def _migrate_legacy_chat(self, key):
+        """Chats used to be pickled whole under the key itself. Turn one into a message log"""
+        serialized_chat = self.redis_client.get(key)
+        if serialized_chat:
+            chat_history = pickle.loads(serialized_chat)
+            self.save_chat(key, chat_history)
+            print(f"Converted pickled chat for key: {key}")
+
+    def _get_summary_key(self, key):
+        """The running summary of older messages is kept next to the log"""
+        return f"{key}:summary"
+
+    def save_summary(self, key, summary, unsummarized_messages=0):
+        """
+        Save the running summary of a chat's older messages
+
+        Parameters:
+            key (str): The key the chat is stored under
+            summary (str): The summary
+            unsummarized_messages (int): How many of the newest messages in the log aren't in the summary
+        """
+        summarized_messages = max(0, self.count_messages(key) - unsummarized_messages)
+        self._write_summary(key, summary, summarized_messages)
+
+    def _write_summary(self, key, summary, summarized_messages):
+        self.redis_client.set(self._get_summary_key(key),
+                              json.dumps({"summary": summary, "summarized_messages": summarized_messages}))
+
+    def load_summary(self, key):
+        """
+        Load the running summary of a chat's older messages
+
+        Returns:
+            The summary, or an empty string, and how many messages from the start of the log it covers
+        """
+        data = self.redis_client.get(self._get_summary_key(key))
+        if not data:
+            return "", 0
+        data = json.loads(data)
+        return data["summary"], data["summarized_messages"]
+
     def delete_chat(self, key):
         """Delete a chat history by key"""
-        self.redis_client.delete(key)
-        print(f"Chat deleted for key: {key}")
\ No newline at end of file
+        self.redis_client.delete(key, self._get_log_key(key), self._get_summary_key(key))
+        print(f"Chat deleted for key: {key}")
@@ -0,0 +1,104 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+class ResponseCache:
+    """
+    Remembers what NPC agents answered to a query, so asking the same thing
+    again doesn't need another round trip to the model.
+
+    Entries are keyed on the character, the normalized query and a digest of
+    whatever world state the answer depends on. The least recently used entries
+    are dropped past max_entries, and entries expire after ttl_seconds.
+    The cache is saved to a JSON file next to the chat logs between sessions.
+    """
+
+    def __init__(self, storage_dir='content/chat_data', filename='response_cache.json',
+                 max_entries=500, ttl_seconds=24 * 60 * 60):
+        self.filepath = os.path.join(storage_dir, filename)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()  # key -> [time stored, output]
+        self.hits = 0
+        self.misses = 0
+        # Used from the agent's background threads
+        self.lock = threading.Lock()
+
+        os.makedirs(storage_dir, exist_ok=True)
+        self.load()
+
+    @staticmethod
+    def normalize_query(query):
+        """Lowercase, drop punctuation and squash spaces, so 'Where is Albert?' matches 'where is albert'"""
+        query = re.sub(r"[^\w\s]", "", query.lower())
+        return " ".join(query.split())
+
+    @staticmethod
+    def make_digest(*parts):
+        """Short fingerprint of some world state, like the output of a tool"""
+        return hashlib.sha1("\0".join(parts).encode('utf-8')).hexdigest()[:16]
+
+    def make_key(self, character_name, query, world_digest=""):
+        return f"{character_name.lower()}|{world_digest}|{self.normalize_query(query)}"
+
+    def get(self, key):
+        """Get a cached output, or None if there isn't a fresh one"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and time.time() - entry[0] > self.ttl_seconds:
+                del self.entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, output):
+        with self.lock:
+            self.entries[key] = [time.time(), output]
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self.save()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self.entries),
+        }
+
+    def save(self):
+        try:
+            with open(self.filepath + ".tmp", 'w', encoding='utf-8') as f:
+                json.dump(list(self.entries.items()), f)
+            os.replace(self.filepath + ".tmp", self.filepath)
+        except Exception as e:
+            print(f"Error saving response cache: {e}")
+
+    def load(self):
+        if not os.path.exists(self.filepath):
+            return
+        try:
+            with open(self.filepath, 'r', encoding='utf-8') as f:
+                now = time.time()
+                for key, entry in json.load(f):
+                    if now - entry[0] <= self.ttl_seconds:
+                        self.entries[key] = entry
+            print(f"Loaded {len(self.entries)} cached responses")
+        except Exception as e:
+            print(f"Error loading response cache: {e}")
+            self.entries.clear()
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.save()
@@ -1,48 +1,136 @@
 import pygame
+from core import assets
 from core.camera import camera
-
-image_path = "content/images"
+from core.render import object_layer
 
 loaded = {}
 
+# Every sub-image of a sheet, cut out once and shared by every Atlas using it.
+# (image, cell_width, cell_height) -> {(cell_x, cell_y): subsurface of the sheet}
+frames = {}
+
+# When on, the first image loaded also loads every small image in
+# content/images and packs them together into one big image.
+pack_small_images = False
+max_packed_size = 64 # Images with both sides at most this many pixels are packed
+packed_atlas_width = 512
+packed = False
+
+def load_image(image):
+    if pack_small_images and not packed:
+        pack_images()
+    if image not in loaded:
+        loaded[image] = assets.get_image(image)
+    return loaded[image]
+
+# Packs the small images into rows of one image, tallest first so each row
+# wastes as little space as possible. Each of them in loaded is then a
+# subsurface of the packed image, so they all share one piece of memory.
+def pack_images():
+    import os
+    global packed
+    packed = True
+    small = []
+    for filename in sorted(os.listdir(assets.image_path)):
+        if not filename.endswith(".png"):
+            continue
+        image = loaded.get(filename) or assets.get_image(filename)
+        if image.get_width() <= max_packed_size and image.get_height() <= max_packed_size:
+            small.append((filename, image))
+    small.sort(key=lambda item: item[1].get_height(), reverse=True)
+
+    positions = []
+    x = y = row_height = 0
+    for filename, image in small:
+        width, height = image.get_size()
+        if x + width > packed_atlas_width:
+            x = 0
+            y += row_height
+            row_height = 0
+        positions.append((filename, image, x, y))
+        x += width
+        row_height = max(row_height, height)
+
+    atlas = pygame.Surface((packed_atlas_width, y + row_height), pygame.SRCALPHA)
+    if pygame.display.get_surface() is not None:
+        atlas = atlas.convert_alpha()
+    for filename, image, x, y in positions:
+        # Copy the pixels as they are, instead of blending them onto the empty atlas
+        atlas.blit(image, (x, y), special_flags=pygame.BLEND_RGBA_MAX)
+        loaded[filename] = atlas.subsurface((x, y) + image.get_size())
+    return atlas
+
+def get_frames(image, cell_width, cell_height):
+    key = (image, cell_width, cell_height)
+    sheet_frames = frames.get(key)
+    if sheet_frames is None:
+        sheet = load_image(image)
+        sheet_frames = {}
+        for cell_y in range(sheet.get_height() // cell_height):
+            for cell_x in range(sheet.get_width() // cell_width):
+                sheet_frames[(cell_x, cell_y)] = sheet.subsurface(
+                    (cell_x * cell_width, cell_y * cell_height, cell_width, cell_height))
+        frames[key] = sheet_frames
+    return sheet_frames
+
 class Sprite:
-    def __init__(self, image, is_ui=False):
+    # layer - Which layer of the world to draw in, see core/render.py
+    def __init__(self, image, is_ui=False, layer=object_layer):
         from core.engine import engine
         global sprites
         self.is_ui = is_ui
-
-        if image in loaded:
-            self.image = loaded[image]
-        else:
-            self.image = pygame.image.load(image_path + "/" + image)
-            loaded[image] = self.image
+        self.image = load_image(image)
+        self.layer = layer
+        # Moves where the sprite sorts, from its bottom edge. For sprites which
+        # should be drawn over or under something their bottom edge doesn't show.
+        self.depth_offset = 0
         
         self.width = self.image.get_width()
         self.height = self.image.get_height()
         if is_ui:
             engine.ui_drawables.append(self)
         else:
-            engine.drawables.append(self)
+            # World sprites are drawn by the engine's SpriteBatch, see core/render.py
+            engine.sprite_batch.add(self)
+
+    # Call for sprites that move around, like characters, so they are
+    # still drawn once they have moved away from where they started.
+    def set_dynamic(self):
+        from core.engine import engine
+        if not self.is_ui:
+            engine.sprite_batch.mark_dynamic(self)
+
+    def set_layer(self, layer):
+        from core.engine import engine
+        self.layer = layer
+        if not self.is_ui:
+            engine.sprite_batch.refresh(self)
 
     def set_image(self, image):
-        if image in loaded:
-            self.image = loaded[image]
-        else:
-            self.image = pygame.image.load(image_path + "/" + image)
-            loaded[image] = self.image
+        self.image = load_image(image)
+        self.resized()
 
     def rotate(self, amo):
         self.image = pygame.transform.rotate(self.image, amo)
+        self.resized()
 
     def scale(self, x_scale, y_scale):
         self.image = pygame.transform.scale(self.image, (x_scale, y_scale))
+        self.resized()
+
+    def resized(self):
+        from core.engine import engine
+        self.width = self.image.get_width()
+        self.height = self.image.get_height()
+        if not self.is_ui:
+            engine.sprite_batch.refresh(self)
 
     def breakdown(self):
         from core.engine import engine
         if self.is_ui:
             engine.ui_drawables.remove(self)
         else:
-            engine.drawables.remove(self)
+            engine.sprite_batch.remove(self)
 
     def draw(self, screen):
         pos = (self.entity.x - camera.x, self.entity.y - camera.y) \
@@ -70,21 +158,23 @@ class Atlas(Sprite):
     # cell_height - Size of sub-images in pixels up and down
     # start_x     - Which sub-images to use. 0 would give you an image to the very left.
     # start_y     - Which sub-images to use. 0 would give you an image on the very top.
-    def __init__(self, image, cell_width, cell_height, start_x, start_y,  is_ui=False):
+    def __init__(self, image, cell_width, cell_height, start_x, start_y,  is_ui=False, layer=object_layer):
         # Will ensure the image is loaded, and the draw function is called.
-        super().__init__(image, is_ui=is_ui)
+        super().__init__(image, is_ui=is_ui, layer=layer)
 
         # We will then take Sprite's image to get a sub-image.
         self.base_image = self.image
 
         self.cell_width = cell_width
         self.cell_height = cell_height
+        self.width = cell_width
+        self.height = cell_height
         self.start_x = start_x
         self.start_y = start_y
 
-        # Create a surface to render each sub-image into
-        from pygame.surface import Surface
-        self.image = Surface((cell_width, cell_height), pygame.SRCALPHA)
+        # The sub-images are cut out once for everyone using this sheet,
+        # so switching between them doesn't draw or create anything.
+        self.frames = get_frames(image, cell_width, cell_height)
 
         # Recycle our code, and just use switch_to to pick the image for us.
         self.switch_to(self.start_x, self.start_y)
@@ -97,18 +187,12 @@ class Atlas(Sprite):
     def switch_to(self, cell_x, cell_y):
         self.cell_x = cell_x
         self.cell_y = cell_y
-        # Coordinates in pixels
-        pixel_x = cell_x * self.cell_width
-        pixel_y = cell_y * self.cell_height
-        self.image.fill((0, 0, 0, 0))
-        self.image.blit(self.base_image, (0, 0), pygame.Rect(pixel_x, pixel_y, self.cell_width, self.cell_height))
+        self.image = self.frames[(cell_x, cell_y)]
 
     # Override the set_image to not do the base functionality of Sprite
     def set_image(self, image):
-        if not image in loaded:
-            loaded[image] = pygame.image.load(image_path + "/" + image)
-            self.base_image = loaded[image]
-        
+        self.base_image = load_image(image)
+        self.frames = get_frames(image, self.cell_width, self.cell_height)
         self.switch_to(self.cell_x, self.cell_y)
 
 
@@ -122,7 +206,7 @@ class Animation(Atlas):
     #                    frame. For example [(0, 0), (0, 1)] will start with the top-left sub-image, then go one image 
     #                    to the right of that one, then go back to the top-left image.
     # frames_per_image - How many frames before switching images. 
-    def __init__(self, image, cell_width, cell_height, frame_coords=[(0, 0)], frames_per_image=10, is_ui=False):
+    def __init__(self, image, cell_width, cell_height, frame_coords=[(0, 0)], frames_per_image=10, is_ui=False, layer=object_layer):
         
         # Frame coords must have at least one thing. If it doesn't, let's throw a helpful error
         if len(frame_coords) == 0:
@@ -134,7 +218,9 @@ class Animation(Atlas):
         start_y = frame_coords[0][1]
         self.frame_coords = frame_coords
 
-        super().__init__(image, cell_width, cell_height, start_x, start_y, is_ui)
+        super().__init__(image, cell_width, cell_height, start_x, start_y, is_ui, layer)
+        # The sub-image for each frame, so update only has to pick the next one
+        self.frame_images = [self.frames[coords] for coords in frame_coords]
 
         self.frames_per_image = frames_per_image
         self.current_image = 0
@@ -149,6 +235,7 @@ class Animation(Atlas):
     def set_frame_coords(self, frame_coords):
         # Just reset everything to the first image in the new frame coords list
         self.frame_coords = frame_coords
+        self.frame_images = [self.frames[coords] for coords in frame_coords]
         self.ticks = 0
         self.current_image = 0
         cell_x = frame_coords[0][0]
@@ -156,6 +243,10 @@ class Animation(Atlas):
         self.switch_to(cell_x, cell_y)
 
 
+    def set_image(self, image):
+        super().set_image(image)
+        self.frame_images = [self.frames[coords] for coords in self.frame_coords]
+
     def update(self):
         self.ticks += 1
 
@@ -168,8 +259,7 @@ class Animation(Atlas):
             if len(self.frame_coords) <= self.current_image:
                 self.current_image = 0
 
-            # Set the position of the next image
-            cell_x = self.frame_coords[self.current_image][0]
-            cell_y = self.frame_coords[self.current_image][1]
-            self.switch_to(cell_x, cell_y)
+            # Show the next image
+            self.cell_x, self.cell_y = self.frame_coords[self.current_image]
+            self.image = self.frame_images[self.current_image]
             
\ No newline at end of file
@@ -1,4 +1,4 @@
-from components.physics import Trigger
+from components.physics import Trigger, refresh_physics
 from components.player import Player
 
 def teleport(area_file, player_x, player_y):
@@ -8,9 +8,17 @@ def teleport(area_file, player_x, player_y):
         player = area.search_for_first(Player)
         player.x = player_x*32
         player.y = player_y*32
+        refresh_physics(player)
 
 
 class Teleporter(Trigger):
     def __init__(self, area_file, player_x=None, player_y=None, x=0, y=0, width=32, height=32):
         super().__init__(lambda other: teleport(area_file, int(player_x), int(player_y)), x, y, width, height)
+        self.area_file = area_file
         print(area_file)
+
+    def setup(self):
+        super().setup()
+        # Read where we lead to in the background, so teleporting is quick
+        from core.area_cache import preload
+        preload(self.area_file)
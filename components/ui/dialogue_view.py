@@ -1,4 +1,6 @@
 import pygame
+import threading
+import time
 from components.ui.window import create_window
 from math import ceil
 from components.entity import Entity
@@ -7,6 +9,7 @@ from components.ui.window import Window
 from components.button import Button
 from components.label import Label
 from core.input import is_key_just_pressed
+from core.tasks import run_in_background
 
 dialogue_box_width = 500  # The size, left and right, of the dialogue box in pixels
 dialogue_box_height = 200  # The size, up and down, of the dialogue box in pixels
@@ -32,6 +35,11 @@ input_box_width = 400
 input_box_height = 30
 letter_speed = 1
 
+# How long to wait for an NPC agent to answer before giving up
+agent_timeout_seconds = 30
+# How many updates between each dot of the "thinking" indicator
+thinking_dot_speed = 20
+
 active_dialogue_view = None
 
 class InputBox(Sprite):
@@ -75,6 +83,9 @@ class DialogueView:
         self.active_input = False
         self.key_cooldown = {}  # To track key press cooldowns
         self.processing_response = False
+        self.pending_response = None # Future for the agent's reply while it is thinking
+        self.cancel_event = None     # Set to tell the agent to stop retrying
+        self.thinking_dots = 0
 
         from core.camera import camera
         window_x = camera.width/2 - dialogue_box_width/2
@@ -227,56 +238,115 @@ class DialogueView:
             print(f"Unknown command {command}")
 
     def process_player_input(self, player_input):
-        """Process the player's input by sending it to the NPC agent and getting a response"""
-        try:
-            from components.npc_agent_db import NPCAgent
+        """Send the player's input to the NPC agent in the background and show that the NPC is thinking"""
+        self.cancel_event = threading.Event()
+        self.pending_input = player_input
+        self.request_time = time.monotonic()
+        self.pending_response = run_in_background(self.request_response, 
+                                                  player_input, 
+                                                  self.cancel_event,
+                                                  self.get_tree_snapshot(),
+                                                  name="npc-agent")
+        self.processing_response = True
+        self.thinking_dots = 0
+        self.speaker_label.set_text(self.npc.obj_name)
+        self.helper_label.set_text("[Thinking...]")
+        self.show_thinking()
+        return True
 
-            if hasattr(self, 'agent'):
-                agent = self.agent
-            else:
-                agent = NPCAgent(character_name=self.npc.obj_name, model="gpt-4o")
-                self.agent = agent
-            
+    def get_tree_snapshot(self):
+        """The trees in the area, for the agent's tree tool. Taken here on the main thread, which is the one changing them"""
+        from core.area import area
+        from components.usable import Choppable
+        trees = []
+        for entity in area.query(Choppable):
+            component = entity.get(Choppable)
+            if component.obj_name == "Pine Tree":
+                trees.append((int(entity.x / 32), int(entity.y / 32)+1, component.is_chopped))
+        return {"trees": trees, "map_width": area.map.width, "map_height": area.map.height}
+
+    def request_response(self, player_input, cancel_event, tree_snapshot):
+        """Runs on a background thread. Asks the NPC agent for a structured response"""
+        from components.npc_agent_db import get_agent
+
+        # Agents are shared between dialogues, this is free once it has been built
+        agent = get_agent(self.npc.obj_name)
+        self.agent = agent
+
+        raw_response = agent.run(player_input, cancel_event, tree_snapshot)
+        if raw_response is None:
+            return None
+        return agent.get_structured_response(raw_response)
+
+    def show_thinking(self):
+        from core.engine import engine
+        dots = 1 + (engine.step // thinking_dot_speed) % 3
+        # Only render the text again when it actually changes
+        if dots != self.thinking_dots:
+            self.thinking_dots = dots
+            self.content_label.set_text("." * dots)
+
+    def check_response(self):
+        """Called every update while the agent is thinking"""
+        if self.pending_response.done():
+            future = self.pending_response
+            self.pending_response = None
+            self.processing_response = False
+            try:
+                self.handle_response(self.pending_input, future.result())
+            except Exception as e:
+                # Add error handling
+                print(f"Error processing player input: {e}")
+                self.lines.append("Sorry, I didn't understand that.")
+            if active_dialogue_view is self:
+                self.next_line()
+        elif time.monotonic() - self.request_time > agent_timeout_seconds:
+            print(f"{self.npc.obj_name} took longer than {agent_timeout_seconds} seconds to respond")
+            self.cancel_response()
+            self.lines.append("Sorry, I lost my train of thought.")
+            self.next_line()
+        else:
+            self.show_thinking()
 
-            raw_response = agent.run(player_input)
-            
-            structured_response = agent.get_structured_response(raw_response)
+    def cancel_response(self):
+        if self.pending_response is not None:
+            self.cancel_event.set()
+            self.pending_response.cancel()
+            self.pending_response = None
+            self.processing_response = False
 
-            if player_input in ["bye","goodbye","bye bye", "ok bye", "thanks bye"]:
-                self.lines = []
-                self.breakdown()
-            else:
-                if hasattr(structured_response, 'isSell') and structured_response.isSell:
-                    if self.npc.obj_name.lower() == "nancy":
-                        self.command("! give 0 1")  # Diamond
-                    elif self.npc.obj_name.lower() == "albert":
-                        self.command("! give 1 1")  # Axe
-            
-           
-            if structured_response and hasattr(structured_response, 'response'):
+    def handle_response(self, player_input, structured_response):
+        """Use the agent's response once it arrives"""
+        agent = self.agent
+
+        if player_input in ["bye","goodbye","bye bye", "ok bye", "thanks bye"]:
+            self.lines = []
+            self.breakdown()
+        else:
+            if hasattr(structured_response, 'isSell') and structured_response.isSell:
+                if self.npc.obj_name.lower() == "nancy":
+                    self.command("! give 0 1")  # Diamond
+                elif self.npc.obj_name.lower() == "albert":
+                    self.command("! give 1 1")  # Axe
+        
+       
+        if structured_response and hasattr(structured_response, 'response'):
 
-                response_lines = structured_response.response
+            response_lines = structured_response.response
 
-                if response_lines and len(response_lines) > 0:
+            if response_lines and len(response_lines) > 0:
 
-                    response_line = response_lines[0]
-                    self.lines.append(response_line)
-                    
-                    agent.update_chat_history(player_input)
-                    
-                    print(f"Agent response: {response_line}")
-                else:
-                    self.lines.append(f"...")
+                response_line = response_lines[0]
+                self.lines.append(response_line)
+                
+                agent.update_chat_history(player_input)
+                
+                print(f"Agent response: {response_line}")
             else:
-                self.lines.append(f"I'm not sure how to respond to that.")
-                print("Error: Could not get structured response from agent")
-            
-        except Exception as e:
-            # Add error handling
-            print(f"Error processing player input: {e}")
-            self.lines.append("Sorry, I didn't understand that.")
-            
-        return True
+                self.lines.append(f"...")
+        else:
+            self.lines.append(f"I'm not sure how to respond to that.")
+            print("Error: Could not get structured response from agent")
 
     def handle_typing(self):
         """Handle keyboard input for the text box"""
@@ -296,14 +366,14 @@ class DialogueView:
                 player_line = f"- {player_input}"
                 #self.lines.append(player_line)
                 
-                # Process the response through the NPC agent
-                self.process_player_input(player_input)
-                
                 # Reset the input box
                 self.input_text = ""
                 self.toggle_input_box(False)
                 self.waiting_for_input = False
-                self.next_line()
+
+                # Process the response through the NPC agent.
+                # The next line is shown once it answers.
+                self.process_player_input(player_input)
             return True
             
         # Handle all other keys
@@ -350,9 +420,19 @@ class DialogueView:
             self.input_label.set_text(self.input_text)
 
     def update(self):
+        # Wait for the NPC to answer, the game keeps running in the meantime
+        if self.pending_response is not None:
+            self.check_response()
+            if is_key_just_pressed(pygame.K_ESCAPE):
+                self.breakdown()
+            return
+
         # Handle keyboard input for the input box when active
         if self.active_input:
             self.handle_typing()
+            # Enter sends the input, don't also skip past the thinking dots
+            if self.pending_response is not None:
+                return
             
         # Handle advancing dialogue with space/enter when not waiting for input
         if not self.waiting_for_input and (is_key_just_pressed(pygame.K_SPACE) or is_key_just_pressed(pygame.K_RETURN)):
@@ -365,10 +445,16 @@ class DialogueView:
     def breakdown(self):
 
         global active_dialogue_view
-        active_dialogue_view = None
+        if active_dialogue_view is self:
+            active_dialogue_view = None
+
+        # Closing the dialogue stops waiting on the agent
+        self.cancel_response()
 
         from core.engine import engine
 
-        engine.active_objs.remove(self)
+        if self in engine.active_objs:
+            engine.active_objs.remove(self)
         for c in self.window.items:
-            c.breakdown()
\ No newline at end of file
+            c.breakdown()
+        self.window.items.clear()
\ No newline at end of file
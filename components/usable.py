@@ -28,7 +28,6 @@ class Choppable(Usable):
 
     def on(self, other, distance):
         from components.player import Player, inventory
-        from components.sprite import Sprite
         player = other.get(Player)
 
         if self.is_chopped:
@@ -43,12 +42,19 @@ class Choppable(Usable):
         if distance < 60:
             self.sound.play()
             player.show_message("Chopping " + self.obj_name)
-            self.entity.get(Sprite).set_image(self.chopped_image)
-            self.is_chopped = True
+            self.chop()
+            from core import world_state
+            world_state.record(self.entity, world_state.chopped)
         else:
             player.show_message("I need to get closer")
 
 
+    def chop(self):
+        from components.sprite import Sprite
+        self.entity.get(Sprite).set_image(self.chopped_image)
+        self.is_chopped = True
+
+
 class Minable(Usable):
     def __init__(self, obj_name):
         super().__init__(obj_name)
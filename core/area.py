@@ -1,4 +1,6 @@
-from core.map import Map
+from core.map import Map, read_tiles
+from core.chunked_map import ChunkedMapFile, StreamedMap, ChunkStreamer, \
+    write_chunked_map, chunked_file_version
 import traceback
 import struct
 
@@ -6,178 +8,270 @@ file_version = 1
 area = None
 map_folder_location = "content/maps"
 
+# What is in a map file, read but not turned into a Map and entities yet
+class AreaData:
+    def __init__(self, version, tiles, entities, modified_time, stamp=0):
+        self.version = version # 0 for legacy text maps
+        self.tiles = tiles # Rows of tile numbers. Empty for chunked maps, they are read while playing
+        self.entities = entities # (index, [id, x, y, args...]) for each entity
+        self.modified_time = modified_time # Of the file when it was read
+        self.stamp = stamp # Hash of the file's contents, changes whenever the map is saved differently
+
+# A 32 bit hash of a map file, small enough to be saved as a world_state record
+def get_stamp(data):
+    import hashlib
+    return int.from_bytes(hashlib.sha1(data).digest()[:4], 'little', signed=True)
+
+# Reads a map file of any version. This doesn't touch the engine,
+# so it can be done on a background thread.
+def read_area_file(area_file):
+    import os
+    path = map_folder_location + "/" + area_file
+    modified_time = os.path.getmtime(path)
+    with open(path, "rb") as file:
+        data = file.read()
+
+    # New file format has a null byte at the beginning
+    if data[0:1] != b'\0':
+        # If it doesn't have this, its the old text format.
+        # Tiles are one digit each, then a minus sign, then a line per entity
+        chunks = str(data, 'utf-8').split('-')
+        tiles = [[int(tile_number) for tile_number in line] 
+                 for line in chunks[0].split('\n') if len(line) > 0]
+        entity_lines = chunks[1].split('\n')[1:]
+        entities = [(index, line.split(',')) for index, line in enumerate(entity_lines) if line.strip()]
+        return AreaData(0, tiles, entities, modified_time, get_stamp(data))
+
+    # For backwards compatibility, 
+    # Try to read the version number from the first 4 bytes
+    # Numbers in the file are little-endian
+    version = struct.unpack_from('<i', data, 1)[0]
+    if version >= chunked_file_version:
+        return AreaData(version, [], [], modified_time, get_stamp(data))
+
+    import io
+    file = io.BytesIO(data)
+    file.seek(5)
+    tilemap_width, tilemap_height = struct.unpack('<2i', file.read(8))
+
+    # Load tile data
+    tiles = read_tiles(file, tilemap_width, tilemap_height)
+
+    # Each entity is a null terminated string, in the rest of the file.
+    # Throw away the last one, because there is a null character at the very end
+    entity_lines = str(file.read(), encoding='utf-8').split('\0')[:-1]
+    entities = [(index, line.split(',')) for index, line in enumerate(entity_lines)]
+    return AreaData(version, tiles, entities, modified_time, get_stamp(data))
+
 class Area:
     def __init__(self, area_file, tile_types, editor_mode=False):
         global area
         area = self
         self.entities = []
+        # For each component class, the entities in the area that have one.
+        # Stored as dicts so they keep the order entities were added in.
+        self.component_index = {}
         self.tile_types = tile_types
         self.editor_mode = editor_mode
+        self.map_file = None # The open chunked map file, while one is being streamed
+        self.streamer = None
         self.load_file(area_file)
         
 
     def search_for_first(self, kind):
-        for e in self.entities:
-            c = e.get(kind)
-            if c is not None:
-                return e
+        entities = self.component_index.get(kind)
+        if entities:
+            return next(iter(entities))
+
+    # All the entities which have every one of the given kinds of component.
+    # For example area.query(Sprite, Body). With no kinds, every entity.
+    def query(self, *kinds):
+        if not kinds:
+            return list(self.entities)
+        found = [self.component_index.get(kind, {}) for kind in kinds]
+        # Start from the smallest group, and check it against the rest
+        smallest = min(found, key=len)
+        return [e for e in smallest if all(e in f for f in found)]
+
+    def add_entity(self, e):
+        self.entities.append(e)
+        e.area = self
+        for c in e.components:
+            self.index_component(e, c)
+
+    def index_component(self, e, c):
+        for kind in type(c).__mro__[:-1]: # Skip object
+            entities = self.component_index.get(kind)
+            if entities is None:
+                entities = {}
+                self.component_index[kind] = entities
+            entities[e] = None
+
+    def unindex_component(self, e, c):
+        # Only forget kinds the entity no longer has any component of
+        for kind in type(c).__mro__[:-1]:
+            if not e.has(kind):
+                entities = self.component_index.get(kind)
+                if entities is not None:
+                    entities.pop(e, None)
+
+    # Takes the entity out of the area without breaking it down
+    def forget_entity(self, e):
+        self.entities.remove(e)
+        e.area = None
+        for kind in e.component_types:
+            entities = self.component_index.get(kind)
+            if entities is not None:
+                entities.pop(e, None)
             
+    # Removes an entity from the world for good, like a mined rock.
+    # It stays gone when the area is loaded again.
     def remove_entity(self, e):
-        self.entities.remove(e)
-        for c in e.components:
-            g = getattr(c, "breakdown", None)
-            if callable(g):
-                c.breakdown()
-        e.components.clear()
+        if e.area is self:
+            from core import world_state
+            world_state.record(e, world_state.removed)
+            e.delete_self()
 
     def load_file(self, area_file):
-        import struct
-        from data.objects import create_entity
         from core.engine import engine
+        from core import area_cache
         
         engine.reset()
+        self.close_map_file()
 
-        file = open(map_folder_location + "/" + area_file, "rb")
-        
-        # New file format has a null byte at the beginning
-        b = struct.unpack('c', file.read(1))[0]
-        b = str(b, 'utf-8')
-        if b != '\0':
-            # If it doesn't have this, its the old file format
-            # We load with the previous method
-            file.close()
-            print("Loading Legacy file")
-            self.load_file_legacy(area_file)
-            return
-        
         self.entities = []
+        self.component_index = {}
+        self.area_file = area_file
         self.name = area_file.split(".")[0].title().replace("_", " ")
-        # If we make it past this part, this is the new file format
-
-        # For backwards compatibility, 
-        # Try to read the version number from the first 4 bytes
-        version = struct.unpack('i', file.read(4))[0]
-        tilemap_width = struct.unpack('i', file.read(4))[0]
-        tilemap_height = struct.unpack('i', file.read(4))[0]
-        tilemap_width = int(tilemap_width)
-        tilemap_height = int(tilemap_height)
-
-        print("loading", tilemap_width, tilemap_height)
-
-        # Load tile data
-        tiles = []
-        for y in range(tilemap_height):
-            row = []
-            for x in range(tilemap_width):
-                binary_data = file.read(2)
-                tile_number = struct.unpack('H', binary_data)[0]
-                row.append(tile_number)
-            tiles.append(row)
-        self.map = Map(tiles, self.tile_types, False)
-
-        # Save each entity, delimited by a null terminated char
-        # We read all the rest of the data from the file for this
-        entity_data = file.read()
-
-        # Convert it to a string
-        entity_data = str(entity_data, encoding='utf-8')
-
-        # Split the string to get each entity
-        entities = entity_data.split('\0')
-
-        # Throw away the last one, because there is a null character at the very end
-        # of the file
-        entities = entities[:len(entities)-1]
-        print(entities)
-
-        # Load each entity
-        for line in entities:
-            try:
-                items = line.split(',')
-                id = int(items[0])
-                x = int(items[1])
-                y = int(items[2])
-                if self.editor_mode:
-                    from components.entity import Entity
-                    from components.sprite import Sprite
-                    from components.editor import EntityPlaceholder
-                    from data.objects import entity_factories
-                    e = Entity(Sprite(entity_factories[id].icon), 
-                               EntityPlaceholder(id, items[3:]), 
-                               x=x*32, 
-                               y=y*32)
-                    if e.has(EntityPlaceholder):
-                        self.entities.append(e)
-                else:
-                    e = create_entity(id, x, y, items[3:])
-                    self.entities.append(e)
-
-            except Exception as e:
-                print(f"Error parsing line: {line}. {e}")
-                traceback.print_exc()
 
-        
-
-    def load_file_legacy(self, area_file):
-        from data.objects import create_entity
-        from core.engine import engine
-        
-        engine.reset()
+        # The editor changes the tiles, so it gets its own copy instead of the cached one
+        if self.editor_mode:
+            data = read_area_file(area_file)
+        else:
+            data = area_cache.get_area_data(area_file)
+        self.file_version = data.version
 
-        # Read all the data from the file
-        file = open(map_folder_location + "/" + area_file, "r")
-        data = file.read()
-        file.close()
-        self.name = area_file.split(".")[0].title().replace("_", " ")
+        if not self.editor_mode:
+            from core.save_game import Autosave
+            from core import world_state
+            Autosave()
+            world_state.check_map(area_file, data.stamp)
+
+        if data.version >= chunked_file_version:
+            # The map is split into chunks, which are read as they are needed
+            self.load_file_chunked(area_file)
+            return
 
+        if data.version == 0:
+            print("Loading Legacy file")
+        print("loading", len(data.tiles[0]) if data.tiles else 0, len(data.tiles))
+        self.map = Map(data.tiles, self.tile_types, False)
 
-        # Split up the data by minus signs
-        chunks = data.split('-')
-        tile_map_data = chunks[0]
-        entity_data = chunks[1]
+        # Load each entity
+        for index, items in data.entities:
+            self.load_entity(items, index)
+
+    def load_file_chunked(self, area_file):
+        self.file_version = chunked_file_version
+        self.map_file = ChunkedMapFile(map_folder_location + "/" + area_file)
+        print("loading chunked", self.map_file.width, self.map_file.height)
+
+        if self.editor_mode:
+            # The editor works on the whole map
+            self.map = Map(self.map_file.read_all_tiles(), self.tile_types, False)
+            for index, items in self.map_file.read_all_entities():
+                self.load_entity(items, index)
+            self.close_map_file()
+            return
 
-        # Load the map
-        self.map = Map(tile_map_data, self.tile_types, True)
+        self.map = StreamedMap(self.map_file, self.tile_types)
+        loaded = [self.load_entity(items, index) for index, items in self.map_file.read_entities()]
+
+        # Start with the chunks around the player, the camera only gets there on its first update
+        self.streamer = ChunkStreamer(self, self.map_file)
+        loaded = [e for e in loaded if e is not None]
+        if loaded:
+            self.streamer.stream_around(loaded[0].x, loaded[0].y)
+
+    def close_map_file(self):
+        if self.streamer is not None:
+            from core.engine import engine
+            if self.streamer in engine.active_objs:
+                engine.active_objs.remove(self.streamer)
+            self.streamer = None
+        if self.map_file is not None:
+            self.map_file.close()
+            self.map_file = None
+
+    # Creates an entity from its line in the map file, split by commas:
+    # the id of its factory, its x and y in tiles, then any extra arguments.
+    # index is where the entity is in the map file.
+    def load_entity(self, items, index=None):
+        try:
+            id = int(items[0])
+            x = int(items[1])
+            y = int(items[2])
+            if self.editor_mode:
+                from components.entity import Entity
+                from components.sprite import Sprite
+                from components.editor import EntityPlaceholder
+                from data.objects import entity_factories
+                e = Entity(Sprite(entity_factories[id].icon), 
+                           EntityPlaceholder(id, items[3:]), 
+                           x=x*32, 
+                           y=y*32)
+                e.index = index
+                if e.has(EntityPlaceholder):
+                    self.add_entity(e)
+                    return e
+            else:
+                # Anything the player changed in the area before is changed again
+                from core import world_state
+                if index is not None and world_state.is_removed(self.area_file, index):
+                    return None
+                from data.objects import create_entity
+                e = create_entity(id, x, y, items[3:], index)
+                world_state.apply(self.area_file, e)
+                self.add_entity(e)
+                return e
 
+        except Exception as e:
+            print(f"Error parsing line: {','.join(items)}. {e}")
+            traceback.print_exc()
 
-        # Load the entities
-        self.entities = []
-        entity_lines = entity_data.split('\n')[1:]
-        for line in entity_lines:
-            try:
-                items = line.split(',')
-                id = int(items[0])
-                x = int(items[1])
-                y = int(items[2])
-                if self.editor_mode:
-                    from components.entity import Entity
-                    from components.sprite import Sprite
-                    from components.editor import EntityPlaceholder
-                    from data.objects import entity_factories
-                    e = Entity(Sprite(entity_factories[id].icon), 
-                               EntityPlaceholder(id, items[3:]), 
-                               x=x*32, 
-                               y=y*32)
-                    if e.has(EntityPlaceholder):
-                        self.entities.append(e)
-                else:
-                    e = create_entity(id, x, y, items[3:])
-                    self.entities.append(e)
-
-            except Exception as e:
-                print(f"Error parsing line: {line}. {e}")
-                traceback.print_exc()
-
-    def save_file(self, filename):
-        from data.objects import create_entity
+    # Maps are saved in the format they were loaded in, unless a version is given.
+    # Version 1 is the whole map in one go, version 2 is split into chunks.
+    def save_file(self, filename, version=None):
         if not self.editor_mode:
             raise Exception("Cannot save file, not in editor mode")
         import struct
+        from components.editor import EntityPlaceholder
+
+        if version is None:
+            version = chunked_file_version if self.file_version >= chunked_file_version else file_version
+
+        lines = []
+        for e in self.entities:
+            p = e.get(EntityPlaceholder)
+            s = f"{p.id},{int(e.x/32)},{int(e.y/32)}"
 
+            # If there are extra arguments for that kind of entity
+            # then we save them. 
+            if p.args is not None and len(p.args) != 0:
+                s += ","
+                s += ",".join(p.args)
+            lines.append(s)
 
         path = map_folder_location + "/" + filename
         file = open(path, "wb")
 
+        if version >= chunked_file_version:
+            from core.map import chunk_size
+            write_chunked_map(file, self.map.tiles, list(enumerate(lines)), chunk_size)
+            file.close()
+            print("saving chunked", self.map.width, self.map.height)
+            return
+
 
         # --- Header of the File ---
         
@@ -186,15 +280,14 @@ class Area:
         file.write(struct.pack('c', bytes('\0', 'utf-8')))
 
         # Write the file version for future updates
-        file.write(struct.pack('i', file_version))
+        file.write(struct.pack('<i', file_version))
 
         # Write the size of the tilemap
         # First Width, then height
-        print(self.map.tiles)
         width = len(self.map.tiles[0])
         height = len(self.map.tiles)
-        file.write(struct.pack('i', width))
-        file.write(struct.pack('i', height))
+        file.write(struct.pack('<i', width))
+        file.write(struct.pack('<i', height))
         print("saving", width, height)
 
 
@@ -203,17 +296,8 @@ class Area:
         # Save the Tile data
         self.map.save_to_file(file)
 
-        
-        for e in self.entities:
-            from components.editor import EntityPlaceholder
-            p = e.get(EntityPlaceholder)
-            s = f"{p.id},{int(e.x/32)},{int(e.y/32)}"
-
-            # If there are extra arguments for that kind of entity
-            # then we save them. 
-            if p.args is not None and len(p.args) != 0:
-                s += ","
-                s += ",".join(p.args)
+        # Each entity is null terminated
+        for s in lines:
             b = bytes(s, 'utf-8')
             packed = struct.pack(f"{len(b)}s", b)
             file.write(packed)
@@ -0,0 +1,79 @@
+import os
+import threading
+from collections import OrderedDict
+from core.tasks import run_in_background
+
+# Keeps recently read map files in memory, so going back to an area
+# only has to create its entities again instead of reading the whole file.
+#
+# Teleporters ask for the area they lead to to be preloaded on a background
+# thread, so by the time the player steps on one it is already read.
+#
+# Entries remember when their file was last changed, and are read again if
+# it changed since, like after saving it in the editor.
+# The cached tiles are shared by every Map made from them, so nothing
+# outside of the editor (which doesn't use the cache) should change them.
+
+max_cached_areas = 8
+
+cache = OrderedDict() # area file -> AreaData, least recently used first
+loading = {} # area file -> Future of the AreaData being read in the background
+lock = threading.Lock()
+hits = 0
+misses = 0
+
+def get_area_data(area_file):
+    """The contents of a map file, from the cache if they are still up to date"""
+    global hits, misses
+    from core.area import map_folder_location
+    modified_time = os.path.getmtime(map_folder_location + "/" + area_file)
+
+    with lock:
+        data = cache.get(area_file)
+        if data is not None and data.modified_time == modified_time:
+            cache.move_to_end(area_file)
+            hits += 1
+            return data
+        future = loading.get(area_file)
+
+    # It is still being preloaded. Waiting for it is still quicker than starting over.
+    if future is not None:
+        data = future.result()
+        if data is not None and data.modified_time == modified_time:
+            hits += 1
+            return data
+
+    misses += 1
+    return read_and_store(area_file)
+
+def preload(area_file):
+    """Start reading a map file in the background, if it isn't cached or being read already"""
+    with lock:
+        if area_file in cache or area_file in loading:
+            return
+        loading[area_file] = run_in_background(preload_in_background, area_file,
+                                               name=f"preload-{area_file}")
+
+def preload_in_background(area_file):
+    try:
+        return read_and_store(area_file)
+    except Exception as e:
+        print(f"Error preloading {area_file}: {e}")
+        return None
+    finally:
+        with lock:
+            loading.pop(area_file, None)
+
+def read_and_store(area_file):
+    from core.area import read_area_file
+    data = read_area_file(area_file)
+    with lock:
+        cache[area_file] = data
+        cache.move_to_end(area_file)
+        while len(cache) > max_cached_areas:
+            cache.popitem(last=False)
+    return data
+
+def clear():
+    with lock:
+        cache.clear()
@@ -0,0 +1,100 @@
+import os
+import io
+import struct
+import hashlib
+import pygame
+
+# Loads every image in the game, once.
+#
+# Images are converted to the same pixel format as the window, so drawing
+# them doesn't have to convert every pixel again each time. That can only
+# be done once the window exists, and tiles and items are created before
+# that, so they ask for their image when it is first drawn instead.
+#
+# Decoding PNGs is the slow part of loading an image, so the decoded pixels
+# are also kept on disk, named after a hash of the PNG. The next time the
+# game starts, an image whose PNG didn't change is read straight from there.
+# Changing a PNG gives it a new hash, so it is decoded again.
+
+image_path = "content/images"
+cache_folder = "content/cache/images"
+use_disk_cache = True
+
+# Cached images start with this: magic, width, height and whether it has
+# transparency. Then the pixels as RGBA or RGB bytes, row by row.
+cache_header = '<4sHHB'
+cache_header_size = struct.calcsize(cache_header)
+cache_magic = b"RAWI"
+
+images = {} # filename -> image converted for the window
+unconverted = {} # filename -> image loaded before there was a window to convert it for
+disk_hits = 0
+disk_misses = 0
+
+def get_image(filename):
+    image = images.get(filename)
+    if image is not None:
+        return image
+
+    image = unconverted.get(filename)
+    if image is None:
+        image = load(filename)
+    if pygame.display.get_surface() is None:
+        unconverted[filename] = image
+        return image
+
+    unconverted.pop(filename, None)
+    if image.get_flags() & pygame.SRCALPHA:
+        image = image.convert_alpha()
+    else:
+        image = image.convert()
+    images[filename] = image
+    return image
+
+def load(filename):
+    global disk_hits, disk_misses
+    path = image_path + "/" + filename
+    if not use_disk_cache:
+        return pygame.image.load(path)
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    cache_path = os.path.join(cache_folder, hashlib.sha1(data).hexdigest() + ".raw")
+    image = read_cached(cache_path)
+    if image is not None:
+        disk_hits += 1
+        return image
+
+    disk_misses += 1
+    image = pygame.image.load(io.BytesIO(data), filename)
+    try:
+        write_cached(cache_path, image)
+    except OSError as e:
+        print(f"Couldn't cache {filename}: {e}")
+    return image
+
+def read_cached(cache_path):
+    try:
+        with open(cache_path, 'rb') as f:
+            data = f.read()
+        magic, width, height, has_alpha = struct.unpack_from(cache_header, data)
+    except (OSError, struct.error):
+        return None
+    mode = "RGBA" if has_alpha else "RGB"
+    if magic != cache_magic or len(data) - cache_header_size != width * height * len(mode):
+        return None
+    return pygame.image.frombytes(data[cache_header_size:], (width, height), mode)
+
+def write_cached(cache_path, image):
+    has_alpha = bool(image.get_flags() & pygame.SRCALPHA)
+    width, height = image.get_size()
+    pixels = pygame.image.tobytes(image, "RGBA" if has_alpha else "RGB")
+    os.makedirs(cache_folder, exist_ok=True)
+    with open(cache_path + ".tmp", 'wb') as f:
+        f.write(struct.pack(cache_header, cache_magic, width, height, has_alpha))
+        f.write(pixels)
+    os.replace(cache_path + ".tmp", cache_path)
+
+def clear():
+    images.clear()
+    unconverted.clear()
@@ -0,0 +1,337 @@
+import sys
+import mmap
+import struct
+from array import array
+from math import floor
+from core.map import Map, tile_size
+
+# Version 2 of the map format splits the world into square chunks of tiles,
+# with an index at the start saying where each chunk is in the file.
+# That way a chunk can be read on its own, without reading the whole map.
+#
+#   '\0'                                   Same first byte as version 1
+#   version, width, height,                '<6i' header, width and height in tiles
+#   chunk_size, chunks_x, chunks_y
+#   index                                  '<QI' per block: where the block starts, and
+#                                          how many bytes of entities it has
+#   blocks                                 The always loaded entities, then every chunk
+#                                          row by row
+#
+# A chunk block is its tiles (little-endian '<H', row by row, edge chunks are
+# smaller) followed by its entities. Entities are stored like in version 1,
+# null terminated "id,x,y,args" strings, except they start with the entity's
+# index in the map, so "index,id,x,y,args".
+#
+# Entities belong to the chunk their tile is in. The ones in
+# always_loaded_entities go in their own block instead, which is loaded
+# together with the area.
+
+chunked_file_version = 2
+header_format = '<6i'
+index_entry_format = '<QI'
+always_loaded_entities = [0] # Entity factory ids, the Player
+
+# While playing, chunks this many chunks away from the one the camera is
+# centered on are loaded. Chunks further than stream_radius + unload_margin
+# are unloaded, so walking back and forth over an edge doesn't keep
+# loading the same chunk.
+stream_radius = 2
+unload_margin = 1
+
+def write_chunked_map(file, tiles, entities, chunk_size):
+    """
+    Write a map in the chunked format
+
+    Parameters:
+        file: A file opened for writing bytes
+        tiles (list): Rows of tile numbers
+        entities (list): (index, "id,x,y,args") for each entity, x and y in tiles
+        chunk_size (int): How many tiles across and down each chunk is
+    """
+    height = len(tiles)
+    width = len(tiles[0]) if height > 0 else 0
+    chunks_x = -(-width // chunk_size)
+    chunks_y = -(-height // chunk_size)
+
+    # Sort the entities into their blocks, block 0 is the always loaded one
+    block_entities = [[] for _ in range(chunks_x * chunks_y + 1)]
+    for index, line in entities:
+        items = line.split(',')
+        id, x, y = int(items[0]), int(items[1]), int(items[2])
+        if id in always_loaded_entities:
+            block = 0
+        else:
+            # Anything outside of the map goes into the closest chunk
+            cx = min(max(x // chunk_size, 0), chunks_x - 1)
+            cy = min(max(y // chunk_size, 0), chunks_y - 1)
+            block = cy * chunks_x + cx + 1
+        block_entities[block].append(f"{index},{line}\0")
+
+    blocks = []
+    for block, lines in enumerate(block_entities):
+        data = b""
+        if block > 0:
+            cy, cx = divmod(block - 1, chunks_x)
+            chunk_tiles = array('H')
+            for row in tiles[cy * chunk_size:(cy + 1) * chunk_size]:
+                chunk_tiles.extend(row[cx * chunk_size:(cx + 1) * chunk_size])
+            if sys.byteorder == 'big':
+                chunk_tiles.byteswap()
+            data = chunk_tiles.tobytes()
+        entity_data = "".join(lines).encode('utf-8')
+        blocks.append((data + entity_data, len(entity_data)))
+
+    file.write(b'\0')
+    file.write(struct.pack(header_format, chunked_file_version, width, height,
+                           chunk_size, chunks_x, chunks_y))
+    offset = 1 + struct.calcsize(header_format) + struct.calcsize(index_entry_format) * len(blocks)
+    for data, entity_bytes in blocks:
+        file.write(struct.pack(index_entry_format, offset, entity_bytes))
+        offset += len(data)
+    for data, _ in blocks:
+        file.write(data)
+
+class ChunkedMapFile:
+    """Reads single chunks out of a chunked map file, which is mapped into memory instead of read"""
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[0:1] != b'\0':
+            raise ValueError(f"{path} is not a chunked map file")
+
+        version, self.width, self.height, self.chunk_size, self.chunks_x, self.chunks_y = \
+            struct.unpack_from(header_format, self.data, 1)
+        if version != chunked_file_version:
+            raise ValueError(f"{path} is map version {version}, not {chunked_file_version}")
+
+        index_start = 1 + struct.calcsize(header_format)
+        block_count = self.chunks_x * self.chunks_y + 1
+        self.index = list(struct.iter_unpack(index_entry_format,
+            self.data[index_start:index_start + struct.calcsize(index_entry_format) * block_count]))
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def get_chunk_size(self, chunk_x, chunk_y):
+        """Width and height in tiles of a chunk, the ones on the edge can be smaller"""
+        return (min(self.chunk_size, self.width - chunk_x * self.chunk_size),
+                min(self.chunk_size, self.height - chunk_y * self.chunk_size))
+
+    def read_tiles(self, chunk_x, chunk_y):
+        """The rows of tile numbers in a chunk"""
+        width, height = self.get_chunk_size(chunk_x, chunk_y)
+        offset, _ = self.index[chunk_y * self.chunks_x + chunk_x + 1]
+        tiles = array('H')
+        tiles.frombytes(self.data[offset:offset + width * height * tiles.itemsize])
+        if sys.byteorder == 'big':
+            tiles.byteswap()
+        return [tiles[y * width:(y + 1) * width].tolist() for y in range(height)]
+
+    def read_entities(self, chunk_x=None, chunk_y=None):
+        """
+        The entities in a chunk, or the always loaded ones if no chunk is given
+
+        Returns:
+            A list of (index, [id, x, y, args...]) with the items as strings
+        """
+        if chunk_x is None:
+            offset, entity_bytes = self.index[0]
+        else:
+            width, height = self.get_chunk_size(chunk_x, chunk_y)
+            offset, entity_bytes = self.index[chunk_y * self.chunks_x + chunk_x + 1]
+            offset += width * height * 2 # Skip the tiles
+
+        entities = []
+        text = str(self.data[offset:offset + entity_bytes], encoding='utf-8')
+        for line in text.split('\0')[:-1]:
+            items = line.split(',')
+            entities.append((int(items[0]), items[1:]))
+        return entities
+
+    def read_all_tiles(self):
+        tiles = [[] for _ in range(self.height)]
+        for chunk_y in range(self.chunks_y):
+            for chunk_x in range(self.chunks_x):
+                for y, row in enumerate(self.read_tiles(chunk_x, chunk_y)):
+                    tiles[chunk_y * self.chunk_size + y].extend(row)
+        return tiles
+
+    def read_all_entities(self):
+        """Every entity in the map, in the order of their index"""
+        entities = self.read_entities()
+        for chunk_y in range(self.chunks_y):
+            for chunk_x in range(self.chunks_x):
+                entities.extend(self.read_entities(chunk_x, chunk_y))
+        entities.sort(key=lambda e: e[0])
+        return entities
+
+class StreamedMap(Map):
+    """
+    A Map that only keeps the chunks it needs in memory.
+    Chunks are read from the file the first time one of their tiles is needed,
+    and dropped again with unload_chunk.
+    A chunk that isn't loaded is never treated as solid. Collision or drawing
+    that reaches it reads it from the file right then, so only tiles past the
+    edge of the map are solid.
+    """
+
+    def __init__(self, map_file, tile_kinds):
+        from core.engine import engine
+        engine.background_drawables.append(self)
+
+        self.map_file = map_file
+        self.tile_kinds = tile_kinds
+        self.tile_size = tile_size
+        self.chunk_size = map_file.chunk_size
+        self.width = map_file.width
+        self.height = map_file.height
+        self.solid_kinds = bytes(1 if kind.is_solid else 0 for kind in tile_kinds)
+
+        # (chunk_x, chunk_y) -> (rows of tiles, solid mask)
+        # The masks are always chunk_size x chunk_size, the part past the
+        # edge of the map is solid.
+        self.loaded = {}
+        self.chunks = {} # Pre-rendered chunks, same as Map
+
+    def get_chunk(self, chunk_x, chunk_y):
+        chunk = self.loaded.get((chunk_x, chunk_y))
+        if chunk is None:
+            tiles = self.map_file.read_tiles(chunk_x, chunk_y)
+            solid = bytearray(b'\1' * (self.chunk_size * self.chunk_size))
+            for y, row in enumerate(tiles):
+                solid[y*self.chunk_size:y*self.chunk_size + len(row)] = \
+                    bytes(self.solid_kinds[tile] for tile in row)
+            chunk = (tiles, solid)
+            self.loaded[(chunk_x, chunk_y)] = chunk
+        return chunk
+
+    def unload_chunk(self, chunk_x, chunk_y):
+        self.loaded.pop((chunk_x, chunk_y), None)
+        self.chunks.pop((chunk_x, chunk_y), None)
+
+    def is_point_solid(self, x, y):
+        x_tile = floor(x/self.tile_size)
+        y_tile = floor(y/self.tile_size)
+        if x_tile < 0 or \
+            y_tile < 0 or \
+            y_tile >= self.height or \
+            x_tile >= self.width:
+            return True
+        chunk_x, x_in_chunk = divmod(x_tile, self.chunk_size)
+        chunk_y, y_in_chunk = divmod(y_tile, self.chunk_size)
+        solid = self.get_chunk(chunk_x, chunk_y)[1]
+        return solid[y_in_chunk*self.chunk_size + x_in_chunk] == 1
+
+    def is_rect_solid(self, x, y, width, height):
+        x_start = floor(x/self.tile_size)
+        y_start = floor(y/self.tile_size)
+        x_end = floor((x + width)/self.tile_size)
+        y_end = floor((y + height)/self.tile_size)
+        if x_start < 0 or \
+            y_start < 0 or \
+            y_end >= self.height or \
+            x_end >= self.width:
+            return True
+        # Same as Map, but a row of the rectangle can cross into the next chunk
+        for y_tile in range(y_start, y_end + 1):
+            chunk_y, y_in_chunk = divmod(y_tile, self.chunk_size)
+            x_tile = x_start
+            while x_tile <= x_end:
+                chunk_x, x_in_chunk = divmod(x_tile, self.chunk_size)
+                count = min(x_end - x_tile + 1, self.chunk_size - x_in_chunk)
+                row_start = y_in_chunk*self.chunk_size + x_in_chunk
+                if self.get_chunk(chunk_x, chunk_y)[1].find(1, row_start, row_start + count) != -1:
+                    return True
+                x_tile += count
+        return False
+
+    def set_tile(self, x, y, index):
+        # Only changes the loaded chunk, the file is never written to
+        x_tile = int(x/self.tile_size)
+        y_tile = int(y/self.tile_size)
+        if x_tile < 0 or \
+            y_tile < 0 or \
+            y_tile >= self.height or \
+            x_tile >= self.width:
+            return
+        chunk_x, x_in_chunk = divmod(x_tile, self.chunk_size)
+        chunk_y, y_in_chunk = divmod(y_tile, self.chunk_size)
+        tiles, solid = self.get_chunk(chunk_x, chunk_y)
+        if tiles[y_in_chunk][x_in_chunk] == index:
+            return
+        tiles[y_in_chunk][x_in_chunk] = index
+        solid[y_in_chunk*self.chunk_size + x_in_chunk] = 1 if self.tile_kinds[index].is_solid else 0
+        self.chunks.pop((chunk_x, chunk_y), None)
+
+    def render_chunk(self, chunk_x, chunk_y):
+        import pygame
+        from core.engine import engine
+        pixels = self.chunk_size * self.tile_size
+        surface = pygame.Surface((pixels, pixels))
+        surface.fill(engine.clear_color)
+        for y, row in enumerate(self.get_chunk(chunk_x, chunk_y)[0]):
+            for x, tile in enumerate(row):
+                surface.blit(self.tile_kinds[tile].image, (x * self.tile_size, y * self.tile_size))
+        return surface
+
+    def save_to_file(self, file):
+        raise Exception("Streamed maps can't be saved, load the area in editor mode")
+
+class ChunkStreamer:
+    """
+    Loads the chunks around the camera while playing, spawning their entities,
+    and unloads the ones that got too far away, despawning their entities.
+    """
+
+    def __init__(self, area, map_file):
+        from core.engine import engine
+        self.area = area
+        self.map_file = map_file
+        self.spawned = {} # (chunk_x, chunk_y) -> entities spawned with that chunk
+        self.center = None
+        engine.active_objs.append(self)
+
+    def update(self):
+        from core.camera import camera
+        self.stream_around(camera.x + camera.width / 2, camera.y + camera.height / 2)
+
+    def stream_around(self, x, y):
+        pixels = self.map_file.chunk_size * tile_size
+        center = (floor(x / pixels), floor(y / pixels))
+        if center == self.center:
+            return
+        self.center = center
+        center_x, center_y = center
+
+        # Chunks can also have been loaded by something far away checking for collisions
+        for chunk in set(self.spawned) | set(self.area.map.loaded):
+            if max(abs(chunk[0] - center_x), abs(chunk[1] - center_y)) > stream_radius + unload_margin:
+                self.unload(chunk)
+
+        for chunk_y in range(max(center_y - stream_radius, 0),
+                             min(center_y + stream_radius + 1, self.map_file.chunks_y)):
+            for chunk_x in range(max(center_x - stream_radius, 0),
+                                 min(center_x + stream_radius + 1, self.map_file.chunks_x)):
+                if (chunk_x, chunk_y) not in self.spawned:
+                    self.load((chunk_x, chunk_y))
+
+    def load(self, chunk):
+        entities = []
+        for index, items in self.map_file.read_entities(*chunk):
+            e = self.area.load_entity(items, index)
+            if e is not None:
+                entities.append(e)
+        self.spawned[chunk] = entities
+
+    def unload(self, chunk):
+        for e in self.spawned.pop(chunk, []):
+            # It might have been removed already, like an enemy that died
+            if e.area is self.area:
+                e.delete_self()
+        self.area.map.unload_chunk(*chunk)
+
+    def unload_all(self):
+        for chunk in list(self.spawned):
+            self.unload(chunk)
@@ -0,0 +1,32 @@
+# Converts maps between the map file versions.
+#
+# Run from the project folder, with map files in content/maps:
+#   python -m core.convert_map forest.map                 Rewrite forest.map as a chunked map
+#   python -m core.convert_map forest.map big_forest.map  Save the chunked map under a new name
+#   python -m core.convert_map forest.map --version 1     Turn a chunked map back into version 1
+import os
+import argparse
+
+def convert(source, destination, version):
+    from core.engine import Engine
+    from core.area import Area
+    from data.tile_types import tile_kinds
+
+    Engine("Convert Map")
+    area = Area(source, tile_kinds, editor_mode=True)
+    area.save_file(destination, version)
+    print(f"Saved {destination} as version {version}, "
+          f"{area.map.width}x{area.map.height} tiles and {len(area.entities)} entities")
+
+if __name__ == "__main__":
+    from core.chunked_map import chunked_file_version
+    parser = argparse.ArgumentParser(description="Convert a map in content/maps to another file version")
+    parser.add_argument("source", help="the map file to read")
+    parser.add_argument("destination", nargs="?", help="where to save it, the source file if not given")
+    parser.add_argument("--version", type=int, default=chunked_file_version, choices=[1, chunked_file_version],
+                        help="the file version to save as")
+    args = parser.parse_args()
+
+    # No need for a window
+    os.environ.setdefault("GAME_HEADLESS", "1")
+    convert(args.source, args.destination or args.source, args.version)
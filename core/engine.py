@@ -1,10 +1,31 @@
+import os
 import pygame
+import time
+
+# Set GAME_HEADLESS=1 to run without a window or sound, e.g. for simulations,
+# soak tests and benchmarks on machines without a display.
+# SDL has to be told before pygame is initialized.
+headless = os.environ.get("GAME_HEADLESS", "") not in ("", "0")
+if headless:
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
 pygame.init()
 
 engine = None
 default_width = 1280
 default_height = 720
 
+# The simulation always advances in fixed steps of 1/updates_per_second.
+# Speeds and timers in the game (movement_speed, walk_speed, cooldowns)
+# are written per update, so this keeps them at the speed they were tuned at.
+updates_per_second = 60
+# How often we draw. This is independent from the simulation rate.
+frames_per_second = 60
+# If a frame takes too long, only catch up this many updates before
+# dropping the rest, otherwise a slow frame makes the next one even slower.
+max_updates_per_frame = 5
+
 class Engine:
     def __init__(self, game_title) -> None:
         from core.camera import create_screen
@@ -17,6 +38,8 @@ class Engine:
         # Layers of what order things are drawn. UI Drawables draw over Background for example
         self.background_drawables = []
         self.drawables = [] # Anything to be drawn in the world
+        from core.render import SpriteBatch
+        self.sprite_batch = SpriteBatch() # The world's sprites, only the ones on screen are drawn
         self.ui_drawables = [] # Anything to be drawn over the world
 
         self.usables = []
@@ -27,6 +50,12 @@ class Engine:
         self.screen = create_screen(default_width, default_height, game_title) # The rectangle in the window itself
         self.stages = {}
         self.current_stage = None
+        self.on_first_frame = None # Called once the first frame has been drawn
+        self.profiler = None # Set to a core.profiler.Profiler to time every frame
+
+        if headless:
+            from core import sound
+            sound.audio_enabled = False
 
     def register(self, stage_name, func):
         self.stages[stage_name] = func
@@ -41,78 +70,176 @@ class Engine:
         func()
 
     def run(self):
-        from core.input import keys_down, mouse_buttons_down, \
-                mouse_buttons_just_pressed, keys_just_pressed, \
-                reset_scroll
-        
-        from components.ui.dialogue_view import active_dialogue_view
-        
+        from core.input import mouse_buttons_just_pressed, keys_just_pressed, reset_scroll
+
+        update_time = 1 / updates_per_second
+        frame_time = 1 / frames_per_second
+        accumulator = 0
+        previous_time = time.perf_counter()
+
         self.running = True
         while self.running:
+            frame_start = time.perf_counter()
+            accumulator += frame_start - previous_time
+            previous_time = frame_start
+
+            profiler = self.profiler
+            if profiler is not None:
+                profiler.begin_frame()
+                profiler.time_phase("events", self.handle_events)
+                profiler.handle_input()
+            else:
+                self.handle_events()
+
+            # Update Code
+            # Run however many fixed steps fit in the time that has passed.
+            updates = 0
+            while accumulator >= update_time and updates < max_updates_per_frame:
+                self.update()
+                accumulator -= update_time
+                updates += 1
+
+                # Presses only count for the first update that sees them
+                reset_scroll()
+                mouse_buttons_just_pressed.clear()
+                keys_just_pressed.clear()
+
+            # We are too far behind to catch up, so drop the backlog
+            if accumulator >= update_time:
+                accumulator = 0
+
+            # Draw Code
+            self.draw()
+            if profiler is not None:
+                profiler.end_frame()
+            if self.on_first_frame is not None:
+                self.on_first_frame()
+                self.on_first_frame = None
+
+            # Only wait for what is left of the frame
+            # (time.sleep lets background threads run meanwhile, pygame.time.delay doesn't)
+            remaining = frame_time - (time.perf_counter() - frame_start)
+            if remaining > 0:
+                time.sleep(remaining)
+
+        if self.profiler is not None:
+            self.profiler.close()
+        pygame.quit()
+
+    # Runs a fixed number of updates as fast as possible, without waiting between them.
+    # Nothing is drawn unless draw_every is set, then every draw_every-th update is drawn.
+    # Returns how long it took, so it can be used to measure update throughput.
+    def simulate(self, steps, draw_every=0):
+        from core.input import mouse_buttons_just_pressed, keys_just_pressed, reset_scroll
+
+        self.running = True
+        started = time.perf_counter()
+        done = 0
+        while done < steps and self.running:
+            profiler = self.profiler
+            if profiler is not None:
+                profiler.begin_frame()
+                profiler.time_phase("events", self.handle_events)
+            else:
+                self.handle_events()
+            self.update()
             reset_scroll()
             mouse_buttons_just_pressed.clear()
             keys_just_pressed.clear()
-            self.step += 1
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    self.running = False
-                elif event.type == pygame.KEYDOWN:
-
-                    if active_dialogue_view is not None and event.key in [pygame.K_w, pygame.K_a, pygame.K_s, pygame.K_d]:
-                        if active_dialogue_view.active_input:
-                            keys_down.add(event.key)
-                            keys_just_pressed.add(event.key)
-                    else:
+            done += 1
+
+            if draw_every and done % draw_every == 0:
+                self.draw()
+            if profiler is not None:
+                profiler.end_frame()
+
+        seconds = time.perf_counter() - started
+        return {
+            "steps": done,
+            "seconds": seconds,
+            "updates_per_second": done / seconds if seconds > 0 else 0.0,
+        }
+
+    def handle_events(self):
+        from core.input import keys_down, mouse_buttons_down, \
+                mouse_buttons_just_pressed, keys_just_pressed
+        from components.ui.dialogue_view import active_dialogue_view
+
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                self.running = False
+            elif event.type == pygame.KEYDOWN:
+
+                if active_dialogue_view is not None and event.key in [pygame.K_w, pygame.K_a, pygame.K_s, pygame.K_d]:
+                    if active_dialogue_view.active_input:
                         keys_down.add(event.key)
                         keys_just_pressed.add(event.key)
+                else:
+                    keys_down.add(event.key)
+                    keys_just_pressed.add(event.key)
 
-                elif event.type == pygame.KEYUP:
-                    keys_down.remove(event.key)
-                elif event.type == pygame.MOUSEBUTTONDOWN:
-                    mouse_buttons_down.add(event.button)
-                    mouse_buttons_just_pressed.add(event.button)
-                elif event.type == pygame.MOUSEBUTTONUP:
-                    mouse_buttons_down.remove(event.button)
-                elif event.type == pygame.MOUSEWHEEL:
-                    from core.input import add_scroll_delta
-                    add_scroll_delta(event.y)
-                elif event.type == pygame.TEXTINPUT:
-                    from core.input import text_input_listeners
-                    for t in text_input_listeners:
-                        t.text_input(event.text)
+            elif event.type == pygame.KEYUP:
+                keys_down.remove(event.key)
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                mouse_buttons_down.add(event.button)
+                mouse_buttons_just_pressed.add(event.button)
+            elif event.type == pygame.MOUSEBUTTONUP:
+                mouse_buttons_down.remove(event.button)
+            elif event.type == pygame.MOUSEWHEEL:
+                from core.input import add_scroll_delta
+                add_scroll_delta(event.y)
+            elif event.type == pygame.TEXTINPUT:
+                from core.input import text_input_listeners
+                for t in text_input_listeners:
+                    t.text_input(event.text)
 
-            # Update Code
-            for a in self.active_objs:
-                a.update()
-
-            # Draw Code
-            self.screen.fill(self.clear_color)
-            
-            # Draw background items like the tiles
-            for b in self.background_drawables:
-                b.draw(self.screen)
+    def update(self):
+        self.step += 1
+        if self.profiler is not None:
+            self.profiler.run_updates(self.active_objs)
+            return
+        for a in self.active_objs:
+            a.update()
 
-            # Draw the main objects
-            for s in self.drawables:
-                s.draw(self.screen)
+    def draw(self):
+        if self.profiler is not None:
+            self.draw_profiled()
+            return
 
-            # Draw Effects
-            from core.effect import effects
-            for e in effects:
-                e.draw(self.screen)
+        self.screen.fill(self.clear_color)
+        
+        # Draw background items like the tiles
+        for b in self.background_drawables:
+            b.draw(self.screen)
 
-            # Draw UI Stuff
-            for l in self.ui_drawables:
-                l.draw(self.screen)
+        # Draw the main objects
+        self.sprite_batch.draw(self.screen)
+        for s in self.drawables:
+            s.draw(self.screen)
 
+        # Draw Effects
+        from core.effect import effects
+        for e in effects:
+            e.draw(self.screen)
 
-            pygame.display.flip()
+        # Draw UI Stuff
+        for l in self.ui_drawables:
+            l.draw(self.screen)
 
-            # Cap the frames
-            pygame.time.delay(17)
-                
-        pygame.quit()
+        pygame.display.flip()
 
+    # Same as draw(), but timing every layer and drawable
+    def draw_profiled(self):
+        from core.effect import effects
+        profiler = self.profiler
+        profiler.time_phase("draw.clear", self.screen.fill, self.clear_color)
+        profiler.run_draws("draw.background", self.background_drawables, self.screen)
+        profiler.time_phase("draw.sprites", self.sprite_batch.draw, self.screen)
+        profiler.run_draws("draw.world", self.drawables, self.screen)
+        profiler.run_draws("draw.effects", effects, self.screen)
+        profiler.run_draws("draw.ui", self.ui_drawables, self.screen)
+        profiler.draw(self.screen)
+        profiler.time_phase("flip", pygame.display.flip)
 
     def reset(self):
         from core.area import area
@@ -124,6 +251,7 @@ class Engine:
         reset_physics()
         self.active_objs.clear()
         self.drawables.clear()
+        self.sprite_batch.clear()
         self.ui_drawables.clear()
         self.background_drawables.clear()
         self.usables.clear()
@@ -1,17 +1,44 @@
 import pygame
+import sys
+from array import array
 from math import ceil, floor
 
 map_folder_location = "content/maps"
-image_path = "content/images"
 tile_size = 32
+chunk_size = 16 # How many tiles across and down each cached chunk is
+max_cached_chunks = 64 # Least recently drawn chunks are dropped past this
+
+# Map files store tiles as unsigned 16 bit little-endian numbers, row by row.
+# They are read and written as one block, instead of one tile at a time.
+def read_tiles(file, width, height):
+    data = array('H')
+    data.frombytes(file.read(width * height * data.itemsize))
+    if len(data) != width * height:
+        raise ValueError(f"Map file ends early, expected {width * height} tiles but got {len(data)}")
+    if sys.byteorder == 'big':
+        data.byteswap()
+    return [data[y * width:(y + 1) * width].tolist() for y in range(height)]
+
+def write_tiles(file, tiles):
+    data = array('H')
+    for row in tiles:
+        data.extend(row)
+    if sys.byteorder == 'big':
+        data.byteswap()
+    file.write(data.tobytes())
 
 class TileKind:
     def __init__(self, name, image, is_solid):
         self.name = name
         self.image_name = image
-        self.image = pygame.image.load(image_path + "/" + image)
         self.is_solid = is_solid
 
+    # Tile kinds are made before the window, so the image is loaded once it is drawn
+    @property
+    def image(self):
+        from core import assets
+        return assets.get_image(self.image_name)
+
 class Map:
     def __init__(self, data, tile_kinds, legacy_data=False):
         from core.engine import engine
@@ -34,17 +61,37 @@ class Map:
 
         # How big in pixels are the tiles?
         self.tile_size = tile_size
+        self.chunk_size = chunk_size
+
+        self.build_solid_mask()
+
+        # Pre-rendered chunks of tiles, keyed by (chunk_x, chunk_y).
+        # A chunk is rendered the first time it is seen, and thrown away
+        # when one of its tiles changes. Kept in the order they were last drawn.
+        self.chunks = {}
+
+    # Builds a flat grid with a 1 for every solid tile, row by row.
+    # Collision checks just look in here instead of going through the tile kinds.
+    def build_solid_mask(self):
+        self.height = len(self.tiles)
+        self.width = len(self.tiles[0]) if self.height > 0 else 0
+        solid_kinds = bytes(1 if kind.is_solid else 0 for kind in self.tile_kinds)
+        self.solid = bytearray(self.width * self.height)
+        for y, row in enumerate(self.tiles):
+            # Rows missing tiles are treated as solid, like the edge of the map
+            row = row[:self.width] + [None] * (self.width - len(row))
+            self.solid[y*self.width:(y+1)*self.width] = \
+                bytes(1 if tile is None else solid_kinds[tile] for tile in row)
 
     def is_point_solid(self, x, y):
-        x_tile = int(x/self.tile_size)
-        y_tile = int(y/self.tile_size)
+        x_tile = floor(x/self.tile_size)
+        y_tile = floor(y/self.tile_size)
         if x_tile < 0 or \
             y_tile < 0 or \
-            y_tile >= len(self.tiles) or \
-            x_tile >= len(self.tiles[y_tile]):
+            y_tile >= self.height or \
+            x_tile >= self.width:
             return True
-        tile = self.tiles[y_tile][x_tile]
-        return self.tile_kinds[tile].is_solid
+        return self.solid[y_tile*self.width + x_tile] == 1
     
     
     def set_tile(self, x, y, index):
@@ -52,63 +99,82 @@ class Map:
         y_tile = int(y/self.tile_size)
         if x_tile < 0 or \
             y_tile < 0 or \
-            y_tile >= len(self.tiles) or \
-            x_tile >= len(self.tiles[y_tile]):
+            y_tile >= self.height or \
+            x_tile >= self.width or \
+            x_tile >= len(self.tiles[y_tile]): # Rows can be missing tiles at the end
+            return
+        # Painting over the same tile shouldn't throw away the chunk
+        if self.tiles[y_tile][x_tile] == index:
             return
         self.tiles[y_tile][x_tile] = index
+        self.solid[y_tile*self.width + x_tile] = 1 if self.tile_kinds[index].is_solid else 0
+        self.chunks.pop((x_tile // self.chunk_size, y_tile // self.chunk_size), None)
 
 
     def is_rect_solid(self, x, y, width, height):
-        # Check the top left and middle (if bigger than tile size)
-        x_checks = int(ceil(width/self.tile_size))
-        y_checks = int(ceil(height/self.tile_size))
-        for yi in range(y_checks):
-            for xi in range(x_checks):
-                x = xi*self.tile_size + x
-                y = yi*self.tile_size + y
-                if self.is_point_solid(x, y):
-                    return True
-        if self.is_point_solid(x + width, y):
-            return True
-        if self.is_point_solid(x, y + height):
-            return True
-        if self.is_point_solid(x + width, y + height):
+        # Every tile the rectangle touches, including its right and bottom edge
+        x_start = floor(x/self.tile_size)
+        y_start = floor(y/self.tile_size)
+        x_end = floor((x + width)/self.tile_size)
+        y_end = floor((y + height)/self.tile_size)
+        if x_start < 0 or \
+            y_start < 0 or \
+            y_end >= self.height or \
+            x_end >= self.width:
             return True
+        # Look for a solid tile in each row's slice of the grid
+        for y_tile in range(y_start, y_end + 1):
+            row_start = y_tile*self.width
+            if self.solid.find(1, row_start + x_start, row_start + x_end + 1) != -1:
+                return True
         return False
     
     def save_to_file(self, file):
-        import struct
-        # Save the width and height
-        i = 0
-        # print(len(self.tiles))
-        for y, row in enumerate(self.tiles):
-            for x, n in enumerate(row):
-                i += 2
-                if n > 50:
-                    print("freak out")
-                packed = struct.pack('H', n)
-                file.write(packed)
-                print("saving", x, y, i)
+        write_tiles(file, self.tiles)
 
 
+    def render_chunk(self, chunk_x, chunk_y):
+        from core.engine import engine
+        pixels = self.chunk_size * self.tile_size
+        surface = pygame.Surface((pixels, pixels))
+        surface.fill(engine.clear_color)
+
+        x_start = chunk_x * self.chunk_size
+        y_start = chunk_y * self.chunk_size
+        y_end = min(y_start + self.chunk_size, len(self.tiles))
+        for y in range(y_start, y_end):
+            row = self.tiles[y]
+            x_end = min(x_start + self.chunk_size, len(row))
+            for x in range(x_start, x_end):
+                image = self.tile_kinds[row[x]].image
+                surface.blit(image, ((x - x_start) * self.tile_size, 
+                                     (y - y_start) * self.tile_size))
+        return surface
+
     def draw(self, screen):
-        # Go row by row
+        # Go chunk by chunk
         from core.camera import camera
+        pixels = self.chunk_size * self.tile_size
 
-        x_start = int(camera.x / self.tile_size)
-        y_start = int(camera.y / self.tile_size)
-        x_end   = int((camera.x + camera.width)/self.tile_size)+1
-        y_end   = int((camera.y + camera.height)/self.tile_size)+1
+        x_start = floor(camera.x / pixels)
+        y_start = floor(camera.y / pixels)
+        x_end   = floor((camera.x + camera.width) / pixels) + 1
+        y_end   = floor((camera.y + camera.height) / pixels) + 1
 
         # Limit the values to the map
-        x_start = x_start if x_start >= 0 else 0
-        y_start = y_start if y_start >= 0 else 0
-        x_end   = x_end   if x_end < len(self.tiles[0]) else len(self.tiles[0])-1
-        y_end   = y_end   if y_end < len(self.tiles) else len(self.tiles)-1
+        x_start = max(x_start, 0)
+        y_start = max(y_start, 0)
+        x_end   = min(x_end, ceil(self.width / self.chunk_size))
+        y_end   = min(y_end, ceil(self.height / self.chunk_size))
 
         for y in range(y_start, y_end):
             for x in range(x_start, x_end):
-                tile = self.tiles[y][x]
-                location = (x * self.tile_size - camera.x, y * self.tile_size - camera.y)
-                image = self.tile_kinds[tile].image
-                screen.blit(image, location)
\ No newline at end of file
+                # Move the chunk to the back so it is the last to be dropped
+                surface = self.chunks.pop((x, y), None)
+                if surface is None:
+                    surface = self.render_chunk(x, y)
+                self.chunks[(x, y)] = surface
+                screen.blit(surface, (x * pixels - camera.x, y * pixels - camera.y))
+
+        while len(self.chunks) > max_cached_chunks:
+            del self.chunks[next(iter(self.chunks))]
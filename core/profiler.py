@@ -0,0 +1,166 @@
+import csv
+import time
+import pygame
+from collections import deque
+
+# Opt-in frame profiler. Set engine.profiler = Profiler() to turn it on.
+#
+# Every frame it times the engine's phases (events, updates, each draw layer,
+# the flip) and every update() and draw() call, grouped by component class,
+# like "Enemy.update" or "Map.draw". Methods listed in watched_methods are
+# timed too. Times of nested calls are also part of whatever called them.
+#
+# F3 shows or hides an overlay with the p50/p95/max of the last
+# history_frames frames. Give it a csv_path to also write every frame's
+# timings to a CSV file, one row per (frame, name).
+
+history_frames = 120 # How many frames the overlay statistics cover
+overlay_rows = 16 # How many of the slowest entries the overlay lists
+overlay_refresh_frames = 15 # Re-render the overlay text this often
+overlay_font_size = 20
+toggle_key = pygame.K_F3
+
+# (module, class, method) of extra methods worth timing that are not update() or draw()
+watched_methods = [
+    ("components.label", "Label", "set_text"),
+]
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[int(fraction * (len(sorted_values) - 1))]
+
+class Profiler:
+    def __init__(self, csv_path=None, show_overlay=True):
+        self.frame = 0
+        self.current = {} # name -> seconds spent in it this frame
+        self.history = {} # name -> the last history_frames frame times, in ms
+        self.show_overlay = show_overlay
+        self.overlay_surfaces = []
+        self.font = None
+        self.wrapped = []
+
+        self.csv_file = None
+        self.csv_writer = None
+        if csv_path is not None:
+            self.csv_file = open(csv_path, 'w', newline='')
+            self.csv_writer = csv.writer(self.csv_file)
+            self.csv_writer.writerow(["frame", "name", "ms"])
+
+        self.watch_methods()
+
+    def watch_methods(self):
+        import importlib
+        for module_name, class_name, method_name in watched_methods:
+            cls = getattr(importlib.import_module(module_name), class_name)
+            original = getattr(cls, method_name)
+            setattr(cls, method_name, self.timed_method(f"{class_name}.{method_name}", original))
+            self.wrapped.append((cls, method_name, original))
+
+    def timed_method(self, name, method):
+        profiler = self
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                profiler.add(name, time.perf_counter() - started)
+        return timed
+
+    def add(self, name, seconds):
+        self.current[name] = self.current.get(name, 0) + seconds
+
+    def begin_frame(self):
+        self.current = {}
+
+    def end_frame(self):
+        for name, seconds in self.current.items():
+            if name not in self.history:
+                self.history[name] = deque(maxlen=history_frames)
+            self.history[name].append(seconds * 1000)
+
+        # Anything that didn't run this frame took no time in it
+        for name, times in self.history.items():
+            if name not in self.current:
+                times.append(0.0)
+
+        if self.csv_writer is not None:
+            for name, seconds in self.current.items():
+                self.csv_writer.writerow([self.frame, name, f"{seconds * 1000:.4f}"])
+
+        self.frame += 1
+        if self.show_overlay and self.frame % overlay_refresh_frames == 0:
+            self.render_overlay()
+
+    def time_phase(self, name, func, *args):
+        started = time.perf_counter()
+        func(*args)
+        self.add(name, time.perf_counter() - started)
+
+    def run_updates(self, objs):
+        started = time.perf_counter()
+        for a in objs:
+            before = time.perf_counter()
+            a.update()
+            self.add(type(a).__name__ + ".update", time.perf_counter() - before)
+        self.add("update", time.perf_counter() - started)
+
+    def run_draws(self, layer_name, drawables, screen):
+        started = time.perf_counter()
+        for d in drawables:
+            before = time.perf_counter()
+            d.draw(screen)
+            self.add(type(d).__name__ + ".draw", time.perf_counter() - before)
+        self.add(layer_name, time.perf_counter() - started)
+
+    def handle_input(self):
+        from core.input import is_key_just_pressed
+        if is_key_just_pressed(toggle_key):
+            self.show_overlay = not self.show_overlay
+            if self.show_overlay:
+                self.render_overlay()
+
+    def get_stats(self):
+        """p50, p95 and max in ms of everything timed, slowest p95 first"""
+        stats = []
+        for name, times in self.history.items():
+            ordered = sorted(times)
+            stats.append((name, percentile(ordered, 0.5), percentile(ordered, 0.95), ordered[-1]))
+        stats.sort(key=lambda s: s[2], reverse=True)
+        return stats
+
+    def render_overlay(self):
+        if self.font is None:
+            self.font = pygame.font.Font(None, overlay_font_size)
+        rows = [("ms", "p50", "p95", "max")]
+        for name, p50, p95, most in self.get_stats()[:overlay_rows]:
+            rows.append((name, f"{p50:.2f}", f"{p95:.2f}", f"{most:.2f}"))
+
+        # The default font isn't monospaced, so each column is rendered on its own
+        self.overlay_surfaces = [[self.font.render(cell, True, (255, 255, 255)) for cell in row]
+                                 for row in rows]
+
+    def draw(self, screen):
+        if not self.show_overlay or not self.overlay_surfaces:
+            return
+        column_x = [0, 200, 260, 320]
+        line_height = self.overlay_surfaces[0][0].get_height()
+        screen.fill((0, 0, 0), (0, 0, 380, line_height * len(self.overlay_surfaces) + 8))
+        for i, row in enumerate(self.overlay_surfaces):
+            for x, surface in zip(column_x, row):
+                screen.blit(surface, (x + 4, i * line_height + 4))
+
+    def print_report(self):
+        print(f"---- Frame Profile (last {history_frames} of {self.frame} frames) ----")
+        print(f"{'':<30}{'p50 [ms]':>10}{'p95 [ms]':>10}{'max [ms]':>10}")
+        for name, p50, p95, most in self.get_stats():
+            print(f"{name:<30}{p50:10.3f}{p95:10.3f}{most:10.3f}")
+
+    def close(self):
+        for cls, method_name, original in self.wrapped:
+            setattr(cls, method_name, original)
+        self.wrapped.clear()
+        if self.csv_file is not None:
+            self.csv_file.close()
+            self.csv_file = None
+            self.csv_writer = None
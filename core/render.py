@@ -0,0 +1,168 @@
+from bisect import bisect_left, bisect_right
+from heapq import merge
+from core.camera import camera
+
+# Draws the sprites in the world.
+#
+# Sprites are drawn layer by layer, and within a layer from the top of the
+# screen down by where their bottom edge is. That way someone standing in
+# front of a tree is drawn over it, and behind it when they walk around it.
+#
+# Each layer keeps its sprites sorted, so a frame doesn't have to sort them
+# all again. Sprites that never move, like trees and rocks, are put in
+# place the first time they are drawn, by which point the map loader has
+# moved them there. Sprites that do move (see Sprite.set_dynamic) are checked
+# every frame, and only taken out and put back in when their bottom edge
+# moved. Each layer is also split into columns by x, and each column is sorted
+# by y. So the sprites on screen are found by looking up where the top and
+# bottom of the camera fall in just the columns it covers, and only the
+# sprites in that part of the area are looked at, however wide or tall it is.
+# The columns are merged back into one drawing order, which is then drawn
+# with a single screen.blits() call.
+
+# Layers, drawn in this order
+ground_layer = 0 # Flat things on the ground, like dropped items and teleporters
+object_layer = 1 # Everything else, sorted by y against each other
+layers = [ground_layer, object_layer]
+
+column_width = 256 # In pixels. Sprites go in the column their left edge is in
+
+class Column:
+    def __init__(self):
+        self.keys = [] # (bottom edge, when the sprite was added), sorted
+        self.sprites = [] # The sprite for each key
+
+class Layer:
+    def __init__(self):
+        self.columns = {} # x // column_width -> Column
+
+    def insert(self, column, key, sprite):
+        c = self.columns.get(column)
+        if c is None:
+            c = Column()
+            self.columns[column] = c
+        index = bisect_right(c.keys, key)
+        c.keys.insert(index, key)
+        c.sprites.insert(index, sprite)
+
+    def remove(self, column, key):
+        c = self.columns[column]
+        index = bisect_left(c.keys, key)
+        del c.keys[index]
+        del c.sprites[index]
+        if not c.keys:
+            del self.columns[column]
+
+    # Sprites in the columns from first to last whose bottom edge is between top and bottom, in drawing order
+    def get_band(self, first, last, top, bottom):
+        bands = []
+        for column in range(first, last + 1):
+            c = self.columns.get(column)
+            if c is None:
+                continue
+            start = bisect_left(c.keys, (top,))
+            end = bisect_left(c.keys, (bottom,))
+            if start < end:
+                bands.append(zip(c.keys[start:end], c.sprites[start:end]))
+        if not bands:
+            return []
+        if len(bands) == 1:
+            return [sprite for _, sprite in bands[0]]
+        return [sprite for _, sprite in merge(*bands, key=lambda pair: pair[0])]
+
+class SpriteBatch:
+    def __init__(self):
+        self.layers = [Layer() for _ in layers]
+        self.order = {} # sprite -> when it was added. Breaks ties so sprites keep their order
+        self.next_order = 0
+        self.placed = {} # sprite -> its layer, column and key, once it is in one
+        self.new = set() # Added or changed since the last frame, not placed yet
+        self.dynamic = set()
+        # How far a sprite's key can be from the top of the camera while it is
+        # still on screen, so looking up the band on screen doesn't miss it
+        self.margin = 0
+        # The widest sprite, so sprites in the column left of the screen that reach onto it are found
+        self.widest = 0
+
+    def __len__(self):
+        return len(self.order)
+
+    def __contains__(self, sprite):
+        return sprite in self.order
+
+    def add(self, sprite):
+        self.order[sprite] = self.next_order
+        self.next_order += 1
+        self.new.add(sprite)
+
+    def remove(self, sprite):
+        if self.order.pop(sprite, None) is None:
+            return
+        self.new.discard(sprite)
+        self.dynamic.discard(sprite)
+        placed = self.placed.pop(sprite, None)
+        if placed is not None:
+            self.layers[placed[0]].remove(placed[1], placed[2])
+
+    # Call after moving, resizing or changing the layer of a sprite that isn't dynamic
+    def refresh(self, sprite):
+        if sprite in self.order:
+            self.new.add(sprite)
+
+    def mark_dynamic(self, sprite):
+        if sprite in self.order:
+            self.dynamic.add(sprite)
+
+    def clear(self):
+        for layer in self.layers:
+            layer.columns.clear()
+        self.order.clear()
+        self.placed.clear()
+        self.new.clear()
+        self.dynamic.clear()
+        self.margin = 0
+        self.widest = 0
+
+    def get_key(self, sprite):
+        return (sprite.entity.y + sprite.height + sprite.depth_offset, self.order[sprite])
+
+    def place(self, sprite):
+        key = self.get_key(sprite)
+        column = int(sprite.entity.x // column_width)
+        placed = self.placed.get(sprite)
+        if placed is not None:
+            if placed == (sprite.layer, column, key):
+                return
+            self.layers[placed[0]].remove(placed[1], placed[2])
+        self.layers[sprite.layer].insert(column, key, sprite)
+        self.placed[sprite] = (sprite.layer, column, key)
+        self.margin = max(self.margin, sprite.height + abs(sprite.depth_offset))
+        self.widest = max(self.widest, sprite.width)
+
+    def get_visible(self):
+        for sprite in self.new:
+            self.place(sprite)
+        self.new.clear()
+        for sprite in self.dynamic:
+            self.place(sprite)
+
+        left = camera.x
+        right = camera.x + camera.width
+        top = camera.y
+        bottom = camera.y + camera.height
+        first = int((left - self.widest) // column_width)
+        last = int(right // column_width)
+        visible = []
+        for layer in self.layers:
+            for sprite in layer.get_band(first, last, top - self.margin, bottom + self.margin):
+                x = sprite.entity.x
+                y = sprite.entity.y
+                if x < right and x + sprite.width > left and y < bottom and y + sprite.height > top:
+                    visible.append(sprite)
+        return visible
+
+    def draw(self, screen):
+        camera_x = camera.x
+        camera_y = camera.y
+        screen.blits([(sprite.image, (sprite.entity.x - camera_x, sprite.entity.y - camera_y))
+                      for sprite in self.get_visible()], False)
@@ -0,0 +1,233 @@
+import os
+import sys
+import struct
+from array import array
+from core.tasks import run_in_background
+
+# Saves and loads the game: which area the player is in, where they are
+# standing, their health and inventory, and everything changed in every
+# area (see core/world_state.py).
+#
+# Saves are a small binary file, every number in it little-endian:
+#
+#   magic, version                 '<4sH'
+#   area file                      '<H' length, then utf-8
+#   player x, y, health            '<3f'
+#   inventory capacity, equipped   '<Hh' (-1 when nothing is equipped)
+#   slot item types                capacity x '<h' (-1 for an empty slot)
+#   slot amounts                   capacity x '<H'
+#   number of areas                '<H'
+#   for each area:
+#     area file                    '<H' length, then utf-8
+#     number of changes            '<I'
+#     changes                      world_state.record_format each
+#
+# While playing, the game is saved every autosave_seconds. The snapshot is
+# taken on the game loop, which only copies a few numbers. Turning it into
+# bytes and writing the file happens on a background thread. Areas whose
+# changes are the same as in the last save reuse the bytes from then.
+
+save_path = "content/saves/save.dat"
+magic = b"AGSV"
+save_version = 1
+autosave_seconds = 30
+
+encoded_areas = {} # area file -> (world_state revision, bytes) from the last save
+saving = None # Future of the save being written, if there is one
+
+class SaveData:
+    def __init__(self, area_file, x, y, health, capacity, equipped_slot, slots, deltas):
+        self.area_file = area_file
+        self.x = x
+        self.y = y
+        self.health = health
+        self.capacity = capacity
+        self.equipped_slot = equipped_slot # Slot index, or None
+        self.slots = slots # (item type index or -1, amount) for each inventory slot
+        self.deltas = deltas # area file -> {entity index: {kind: value}}, or bytes already encoded
+
+def pack_string(text):
+    data = text.encode('utf-8')
+    return struct.pack('<H', len(data)) + data
+
+def read_string(data, offset):
+    length = struct.unpack_from('<H', data, offset)[0]
+    offset += 2
+    return str(data[offset:offset + length], 'utf-8'), offset + length
+
+def little_endian(numbers):
+    if sys.byteorder == 'big':
+        numbers.byteswap()
+    return numbers.tobytes()
+
+def encode_deltas(deltas):
+    from core.world_state import record_format
+    pack = struct.Struct(record_format).pack
+    records = [pack(index, kind, value)
+               for index, changes in deltas.items()
+               for kind, value in changes.items()]
+    return struct.pack('<I', len(records)) + b"".join(records)
+
+def encode(save):
+    """Turn a SaveData into the bytes of a save file"""
+    parts = [struct.pack('<4sH', magic, save_version),
+             pack_string(save.area_file),
+             struct.pack('<3f', save.x, save.y, save.health),
+             struct.pack('<Hh', save.capacity, -1 if save.equipped_slot is None else save.equipped_slot),
+             little_endian(array('h', [item for item, _ in save.slots])),
+             little_endian(array('H', [amount for _, amount in save.slots])),
+             struct.pack('<H', len(save.deltas))]
+    for area_file, deltas in save.deltas.items():
+        parts.append(pack_string(area_file))
+        parts.append(deltas if isinstance(deltas, bytes) else encode_deltas(deltas))
+    return b"".join(parts)
+
+def decode(data):
+    """Turn the bytes of a save file back into a SaveData"""
+    from core.world_state import record_format, record_size
+    found_magic, version = struct.unpack_from('<4sH', data, 0)
+    if found_magic != magic:
+        raise ValueError("Not a save file")
+    if version != save_version:
+        raise ValueError(f"Save file version {version} isn't supported")
+    offset = struct.calcsize('<4sH')
+
+    area_file, offset = read_string(data, offset)
+    x, y, health = struct.unpack_from('<3f', data, offset)
+    offset += struct.calcsize('<3f')
+    capacity, equipped_slot = struct.unpack_from('<Hh', data, offset)
+    offset += struct.calcsize('<Hh')
+
+    items = array('h')
+    items.frombytes(data[offset:offset + capacity * items.itemsize])
+    offset += capacity * items.itemsize
+    amounts = array('H')
+    amounts.frombytes(data[offset:offset + capacity * amounts.itemsize])
+    offset += capacity * amounts.itemsize
+    if sys.byteorder == 'big':
+        items.byteswap()
+        amounts.byteswap()
+
+    area_count = struct.unpack_from('<H', data, offset)[0]
+    offset += 2
+    deltas = {}
+    for _ in range(area_count):
+        delta_area, offset = read_string(data, offset)
+        count = struct.unpack_from('<I', data, offset)[0]
+        offset += 4
+        changes = {}
+        for index, kind, value in struct.iter_unpack(record_format, data[offset:offset + count * record_size]):
+            changes.setdefault(index, {})[kind] = value
+        offset += count * record_size
+        deltas[delta_area] = changes
+
+    return SaveData(area_file, x, y, health, capacity,
+                    None if equipped_slot < 0 else equipped_slot,
+                    list(zip(items, amounts)), deltas)
+
+def take_snapshot():
+    """What needs saving right now. Quick, so it can be called from the game loop"""
+    from core.area import area
+    from core import world_state
+    from components.player import Player, inventory
+    from data.item_types import item_types
+
+    player = area.search_for_first(Player)
+    if player is None:
+        return None
+    slots = [(-1 if slot.type is None else item_types.index(slot.type), slot.amount)
+             for slot in inventory.slots]
+
+    deltas = {}
+    for area_file, area_deltas in world_state.get_all_deltas().items():
+        revision = world_state.revisions.get(area_file, 0)
+        encoded = encoded_areas.get(area_file)
+        if encoded is not None and encoded[0] == revision:
+            deltas[area_file] = encoded[1]
+        else:
+            # Copy it, the game keeps changing the original while we save
+            deltas[area_file] = (revision, {index: dict(changes) for index, changes in area_deltas.items()})
+
+    return SaveData(area.area_file, player.x, player.y, player.get(Player).combat.health,
+                    inventory.capacity, inventory.equipped_slot, slots, deltas)
+
+def write_snapshot(save):
+    # Encode the areas that changed, and remember them for next time
+    for area_file, deltas in save.deltas.items():
+        if isinstance(deltas, tuple):
+            revision, changes = deltas
+            encoded = encode_deltas(changes)
+            encoded_areas[area_file] = (revision, encoded)
+            save.deltas[area_file] = encoded
+
+    data = encode(save)
+    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+    with open(save_path + ".tmp", 'wb') as f:
+        f.write(data)
+    # Replacing it in one go means a crash never leaves half a save
+    os.replace(save_path + ".tmp", save_path)
+    return len(data)
+
+def save_game(in_background=True):
+    """Save the game. Returns the Future of the background save, or None if it was skipped"""
+    global saving
+    if saving is not None and not saving.done():
+        return None
+    save = take_snapshot()
+    if save is None:
+        return None
+    if not in_background:
+        write_snapshot(save)
+        return None
+    saving = run_in_background(write_snapshot, save, name="save-game")
+    return saving
+
+def has_save():
+    return os.path.exists(save_path)
+
+def read_save():
+    with open(save_path, 'rb') as f:
+        return decode(f.read())
+
+def load_game():
+    """The LoadGame stage: puts the player back where and how they were saved"""
+    from core.area import Area
+    from core import world_state
+    from data.tile_types import tile_kinds
+
+    save = read_save()
+    world_state.restore(save.deltas)
+    encoded_areas.clear()
+    area = Area(save.area_file, tile_kinds)
+
+    # Only import the player once there is an area, it keeps a reference to it
+    from components.physics import refresh_physics
+    from components.player import Player, inventory
+    from data.item_types import item_types
+    for slot, (item, amount) in zip(inventory.slots, save.slots):
+        slot.type = None if item < 0 else item_types[item]
+        slot.amount = amount
+    inventory.equipped_slot = save.equipped_slot
+
+    player = area.search_for_first(Player)
+    if player is not None:
+        player.x = save.x
+        player.y = save.y
+        player.get(Player).combat.health = save.health
+        refresh_physics(player)
+    inventory.notify()
+
+class Autosave:
+    """Saves the game every autosave_seconds while playing"""
+
+    def __init__(self):
+        from core.engine import engine, updates_per_second
+        self.countdown = autosave_seconds * updates_per_second
+        engine.active_objs.append(self)
+
+    def update(self):
+        from core.engine import updates_per_second
+        self.countdown -= 1
+        if self.countdown <= 0:
+            self.countdown = autosave_seconds * updates_per_second
+            save_game()
@@ -0,0 +1,88 @@
+from math import floor
+
+default_cell_size = 128
+
+# Buckets objects into a uniform grid of cells so we only have to look at
+# the objects near a point instead of every object in the world.
+#
+# Each object is stored with its own rectangle (x, y, width, height) in
+# world pixels, and is added to every cell that rectangle overlaps.
+class SpatialHash:
+    def __init__(self, cell_size=default_cell_size):
+        self.cell_size = cell_size
+        self.cells = {}     # (cell_x, cell_y) -> set of objects
+        self.object_cells = {} # object -> (x_start, y_start, x_end, y_end) cell range
+
+    def __len__(self):
+        return len(self.object_cells)
+
+    def __contains__(self, obj):
+        return obj in self.object_cells
+
+    def clear(self):
+        self.cells.clear()
+        self.object_cells.clear()
+
+    def get_cell_range(self, x, y, width, height):
+        return (floor(x / self.cell_size),
+                floor(y / self.cell_size),
+                floor((x + width) / self.cell_size),
+                floor((y + height) / self.cell_size))
+
+    # Adds the object, or moves it if it is already in here.
+    def insert(self, obj, x, y, width, height):
+        new_range = self.get_cell_range(x, y, width, height)
+        old_range = self.object_cells.get(obj)
+        if old_range == new_range:
+            # Still in the same cells, nothing to do
+            return
+        if old_range is not None:
+            self.remove_from_cells(obj, old_range)
+        self.object_cells[obj] = new_range
+        x_start, y_start, x_end, y_end = new_range
+        for cy in range(y_start, y_end + 1):
+            for cx in range(x_start, x_end + 1):
+                cell = self.cells.get((cx, cy))
+                if cell is None:
+                    cell = set()
+                    self.cells[(cx, cy)] = cell
+                cell.add(obj)
+
+    def remove(self, obj):
+        cell_range = self.object_cells.pop(obj, None)
+        if cell_range is not None:
+            self.remove_from_cells(obj, cell_range)
+
+    def remove_from_cells(self, obj, cell_range):
+        x_start, y_start, x_end, y_end = cell_range
+        for cy in range(y_start, y_end + 1):
+            for cx in range(x_start, x_end + 1):
+                cell = self.cells.get((cx, cy))
+                if cell is None:
+                    continue
+                cell.discard(obj)
+                if len(cell) == 0:
+                    del self.cells[(cx, cy)]
+
+    # Everything stored in the cells from (x_start, y_start) to (x_end, y_end)
+    def query_range(self, x_start, y_start, x_end, y_end):
+        found = set()
+        for cy in range(y_start, y_end + 1):
+            for cx in range(x_start, x_end + 1):
+                cell = self.cells.get((cx, cy))
+                if cell is not None:
+                    found.update(cell)
+        return found
+
+    # Everything which might overlap the rectangle.
+    # Callers still do the exact check, this just narrows it down.
+    def query_rect(self, x, y, width, height):
+        return self.query_range(*self.get_cell_range(x, y, width, height))
+
+    # Everything which might overlap the circle.
+    # Callers still do the exact check, this just narrows it down.
+    def query_circle(self, circle_x, circle_y, radius):
+        return self.query_rect(circle_x - radius,
+                               circle_y - radius,
+                               radius * 2,
+                               radius * 2)
@@ -0,0 +1,65 @@
+import builtins
+import sys
+import threading
+import time
+
+# Measures where the time goes while the game starts up.
+#
+# Once started, every module imported for the first time on the main thread
+# is timed, the same way `python -X importtime` does: "self" is the time spent
+# in the module itself, "cumulative" includes everything it imported.
+# Call mark() to time bigger steps, and report() to print it all.
+
+top_imports = 25 # How many of the slowest imports to list
+
+start_time = None
+marks = []         # (name, seconds since start)
+import_times = []  # (module name, self seconds, cumulative seconds, depth)
+original_import = builtins.__import__
+import_stack = []  # Time spent in child imports, one entry per import in progress
+
+def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    # Only time the first import of a module, on the main thread
+    if level != 0 or name in sys.modules or \
+        threading.current_thread() is not threading.main_thread():
+        return original_import(name, globals, locals, fromlist, level)
+
+    import_stack.append(0)
+    started = time.perf_counter()
+    try:
+        return original_import(name, globals, locals, fromlist, level)
+    finally:
+        cumulative = time.perf_counter() - started
+        child_time = import_stack.pop()
+        import_times.append((name, cumulative - child_time, cumulative, len(import_stack)))
+        if import_stack:
+            import_stack[-1] += cumulative
+
+def start():
+    global start_time
+    start_time = time.perf_counter()
+    builtins.__import__ = timed_import
+
+def stop():
+    builtins.__import__ = original_import
+
+def mark(name):
+    if start_time is not None:
+        marks.append((name, time.perf_counter() - start_time))
+
+def report():
+    stop()
+    mark("First frame drawn")
+    print("---- Startup Report ----")
+    previous = 0
+    for name, at in marks:
+        print(f"{at*1000:9.1f} ms  (+{(at - previous)*1000:7.1f} ms)  {name}")
+        previous = at
+
+    print(f"\nSlowest imports (top {top_imports} by cumulative time)")
+    print(f"{'self [ms]':>10} | {'cumulative [ms]':>15} | imported package")
+    slowest = sorted(import_times, key=lambda i: i[2], reverse=True)[:top_imports]
+    for name, self_time, cumulative, depth in slowest:
+        print(f"{self_time*1000:10.1f} | {cumulative*1000:15.1f} | {'  ' * depth}{name}")
+    total = sum(i[1] for i in import_times)
+    print(f"\n{len(import_times)} modules imported in {total*1000:.1f} ms")
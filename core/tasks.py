@@ -0,0 +1,24 @@
+import threading
+from concurrent.futures import Future
+
+# Runs func(*args) on a background thread and returns a Future for the result.
+#
+# The game loop should never wait on slow work like talking to an NPC agent
+# or reading files. Start it with this, then check future.done() from an
+# update() function and pick up future.result() once it is finished.
+#
+# The threads are daemons, so closing the game doesn't wait for them.
+def run_in_background(func, *args, name=None):
+    future = Future()
+
+    def work():
+        # The future may have been cancelled before we got to start
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(func(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=work, name=name, daemon=True).start()
+    return future
@@ -0,0 +1,162 @@
+import os
+import struct
+
+# Remembers what the player changed in each area, like chopped trees, mined
+# rocks, picked up items and killed enemies, so they stay that way when the
+# area is loaded again, even after restarting the game.
+#
+# Only the changes are stored, not the whole area. Each change is a small
+# record of which entity (its index in the map file), what happened to it,
+# and a value. Records are appended to one file per area, and applied to
+# the entities as the area loads.
+#
+# The entity indexes only mean something for the map file they were made
+# against, and saving a map in the editor numbers its entities again. So each
+# area's changes also hold a stamp of its map file, and are dropped when the
+# map file no longer matches it.
+
+save_folder = "content/saves/world"
+record_format = '<iBi' # entity index, kind of change, value
+record_size = struct.calcsize(record_format)
+
+# Kinds of change
+removed = 1  # Gone for good: mined, picked up or killed. Isn't created at all
+chopped = 2  # A chopped tree
+quantity = 3 # A dropped item that was partly picked up, value is how many are left
+map_stamp = 4 # The stamp of the map file the changes were made against
+
+# The map stamp is stored like any other change, on an index no entity has
+stamp_index = -1
+
+# Rewrite a file once it has this many times more records than changes,
+# like when one item's quantity changed over and over.
+compact_ratio = 4
+
+area_deltas = {} # area file -> {entity index: {kind: value}}
+# area file -> when its changes last changed, so savers can tell what changed.
+# Taken from last_revision, which only ever goes up, even when clear() forgets
+# everything, so a revision never stands for two different sets of changes.
+revisions = {}
+last_revision = 0
+map_stamps = {} # area file -> stamp of its map file, as it was loaded this session
+
+def bump_revision(area_file):
+    global last_revision
+    last_revision += 1
+    revisions[area_file] = last_revision
+
+def get_filepath(area_file):
+    return os.path.join(save_folder, area_file.split(".")[0] + ".delta")
+
+def get_deltas(area_file):
+    """Every change recorded for an area, by entity index"""
+    deltas = area_deltas.get(area_file)
+    if deltas is not None:
+        return deltas
+
+    deltas = {}
+    area_deltas[area_file] = deltas
+    bump_revision(area_file)
+    filepath = get_filepath(area_file)
+    if not os.path.exists(filepath):
+        return deltas
+
+    with open(filepath, 'rb') as f:
+        data = f.read()
+    # A crash in the middle of a write could leave part of a record at the end
+    data = data[:len(data) - len(data) % record_size]
+    records = 0
+    for index, kind, value in struct.iter_unpack(record_format, data):
+        deltas.setdefault(index, {})[kind] = value
+        records += 1
+
+    if records > compact_ratio * sum(len(d) for d in deltas.values()):
+        compact(area_file)
+    return deltas
+
+def record(entity, kind, value=0):
+    """Remember a change to an entity that was loaded from a map file"""
+    from core.area import area
+    if entity.index is None or area is None or area.editor_mode:
+        return
+    area_file = area.area_file
+    deltas = get_deltas(area_file)
+    records = []
+    if stamp_index not in deltas and area_file in map_stamps:
+        deltas[stamp_index] = {map_stamp: map_stamps[area_file]}
+        records.append(struct.pack(record_format, stamp_index, map_stamp, map_stamps[area_file]))
+    deltas.setdefault(entity.index, {})[kind] = value
+    records.append(struct.pack(record_format, entity.index, kind, value))
+    bump_revision(area_file)
+
+    os.makedirs(save_folder, exist_ok=True)
+    with open(get_filepath(area_file), 'ab') as f:
+        f.write(b"".join(records))
+
+def check_map(area_file, stamp):
+    """Drop an area's changes if they were made against a different version of its map file"""
+    map_stamps[area_file] = stamp
+    deltas = get_deltas(area_file)
+    if not deltas or deltas.get(stamp_index, {}).get(map_stamp) == stamp:
+        return
+    print(f"{area_file} changed since it was last played, forgetting the changes made to it")
+    deltas.clear()
+    bump_revision(area_file)
+    filepath = get_filepath(area_file)
+    if os.path.exists(filepath):
+        os.remove(filepath)
+
+def compact(area_file):
+    """Rewrite an area's file with just one record per change"""
+    filepath = get_filepath(area_file)
+    with open(filepath + ".tmp", 'wb') as f:
+        for index, changes in get_deltas(area_file).items():
+            for kind, value in changes.items():
+                f.write(struct.pack(record_format, index, kind, value))
+    os.replace(filepath + ".tmp", filepath)
+
+def get_all_deltas():
+    """The changes of every area that has any, including ones not visited yet this session"""
+    if os.path.exists(save_folder):
+        for filename in os.listdir(save_folder):
+            if filename.endswith(".delta"):
+                get_deltas(filename[:-len(".delta")] + ".map")
+    return {area_file: deltas for area_file, deltas in area_deltas.items() if deltas}
+
+def restore(all_deltas):
+    """Replace every change with the given ones, like when loading a saved game"""
+    clear()
+    os.makedirs(save_folder, exist_ok=True)
+    for area_file, deltas in all_deltas.items():
+        area_deltas[area_file] = deltas
+        bump_revision(area_file)
+        compact(area_file)
+
+def is_removed(area_file, index):
+    changes = get_deltas(area_file).get(index)
+    return changes is not None and removed in changes
+
+def apply(area_file, entity):
+    """Bring a freshly created entity up to date with what happened to it"""
+    changes = get_deltas(area_file).get(entity.index)
+    if not changes:
+        return
+    if chopped in changes:
+        from components.usable import Choppable
+        tree = entity.get(Choppable)
+        if tree is not None:
+            tree.chop()
+    if quantity in changes:
+        from components.inventory import DroppedItem
+        item = entity.get(DroppedItem)
+        if item is not None:
+            item.quantity = changes[quantity]
+
+def clear():
+    """Forget every change, in memory and on disk"""
+    area_deltas.clear()
+    revisions.clear()
+    if os.path.exists(save_folder):
+        for filename in os.listdir(save_folder):
+            if filename.endswith(".delta"):
+                os.remove(os.path.join(save_folder, filename))
@@ -1,13 +1,14 @@
 from components.entity import Entity
 from components.sprite import Sprite, Animation
 from components.player import Player
-from components.physics import Body
+from components.physics import Body, refresh_physics
 from components.teleporter import Teleporter
 from components.inventory import Inventory, DroppedItem
 from data.item_types import item_types
 from components.usable import Usable, Choppable, Minable
 from components.enemy import Enemy
 from components.npc import NPC
+from core.render import ground_layer
 
 class EntityFactory:
     def __init__(self, name, icon, factory, arg_names=[], defaults=[]):
@@ -41,7 +42,7 @@ entity_factories = [
     # 3
     EntityFactory('Teleporter Up',
                   'teleporter_up.png', 
-                 lambda args: Entity(Teleporter(args[0], args[1], args[2]), Sprite("teleporter_up.png")),
+                 lambda args: Entity(Teleporter(args[0], args[1], args[2]), Sprite("teleporter_up.png", layer=ground_layer)),
                  ['Area File', 'Player X', 'Player Y'],
                  ['forest.map', '1', '1']
                  ), 
@@ -49,7 +50,7 @@ entity_factories = [
     # 4
     EntityFactory('Teleporter Right',
                   'teleporter_right.png', 
-                 lambda args: Entity(Teleporter(args[0], args[1], args[2]), Sprite("teleporter_right.png")),
+                 lambda args: Entity(Teleporter(args[0], args[1], args[2]), Sprite("teleporter_right.png", layer=ground_layer)),
                  ['Area File', 'Player X', 'Player Y'],
                  ['forest.map', '1', '1']
                  ), 
@@ -57,7 +58,7 @@ entity_factories = [
     # 5
     EntityFactory('Teleporter Down', 
                   'teleporter_down.png',
-                 lambda args: Entity(Teleporter(args[0], args[1], args[2]), Sprite("teleporter_down.png")),
+                 lambda args: Entity(Teleporter(args[0], args[1], args[2]), Sprite("teleporter_down.png", layer=ground_layer)),
                 ['Area File', 'Player X', 'Player Y'],
                  ['forest.map', '1', '1']
                 ), 
@@ -65,7 +66,7 @@ entity_factories = [
     # 6
     EntityFactory('Teleporter Left', 
                   'teleporter_left.png',
-                 lambda args: Entity(Teleporter(args[0], args[1], args[2]), Sprite("teleporter_left.png")),
+                 lambda args: Entity(Teleporter(args[0], args[1], args[2]), Sprite("teleporter_left.png", layer=ground_layer)),
                  ['Area File', 'Player X', 'Player Y'],
                  ['forest.map', '1', '1']
                  ), 
@@ -74,7 +75,7 @@ entity_factories = [
     EntityFactory('Dropped Item', 
                   'diamond.png',
                  lambda args: Entity(DroppedItem(item_types[int(args[0])], int(args[1])), 
-                        Sprite(item_types[int(args[0])].icon_name)),
+                        Sprite(item_types[int(args[0])].icon_name, layer=ground_layer)),
                  ['Item Type ID', 'Quantity'],
                  ['1', '1']
                  ), 
@@ -102,6 +103,7 @@ def create_entity(id, x, y, data=None, index=None):
     e.index = index
     e.x = x*32
     e.y = y*32
+    refresh_physics(e)
     return e
 
         
\ No newline at end of file
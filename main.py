@@ -1,13 +1,67 @@
+import argparse
+
+parser = argparse.ArgumentParser(description="Adventure Game")
+parser.add_argument("--startup-report", action="store_true",
+                    help="print how long each part of starting up took, and the slowest imports")
+parser.add_argument("--headless", action="store_true",
+                    help="run without a window or sound, as fast as possible, for --steps updates")
+parser.add_argument("--steps", type=int, default=600,
+                    help="how many updates to run in headless mode")
+parser.add_argument("--stage", default="Menu",
+                    help="which stage to start in (Menu, Play, LoadGame, EditorChooseFile)")
+parser.add_argument("--draw-every", type=int, default=0,
+                    help="in headless mode, also draw every N updates (0 never draws)")
+parser.add_argument("--profile", action="store_true",
+                    help="time every frame by phase and component, F3 toggles the overlay")
+parser.add_argument("--profile-csv", metavar="PATH",
+                    help="also write every frame's timings to this CSV file (implies --profile)")
+args = parser.parse_args()
+
+if args.headless:
+    # Has to be set before pygame is initialized in core.engine
+    import os
+    os.environ["GAME_HEADLESS"] = "1"
+
+if args.startup_report:
+    from core import startup
+    startup.start()
+
 from core.engine import Engine
 from stages.menu import menu
 from stages.play import play
+from core.save_game import load_game
 from stages.editor.choose_file import editor_choose_file
 from stages.editor.edit_map import edit_map
 
+if args.startup_report:
+    startup.mark("Imported engine and stages")
+
 e = Engine("Adventure Game")
 e.register("Menu", menu)
 e.register("Play", play)
+e.register("LoadGame", load_game)
 e.register("EditorChooseFile", editor_choose_file)
 e.register("EditorEditMap", edit_map)
-e.switch_to("Menu")
-e.run()
+
+if args.startup_report:
+    startup.mark("Created engine and window")
+
+if args.profile or args.profile_csv:
+    from core.profiler import Profiler
+    e.profiler = Profiler(csv_path=args.profile_csv)
+
+e.switch_to(args.stage)
+
+if args.startup_report:
+    startup.mark(f"Built {args.stage}")
+    e.on_first_frame = startup.report
+
+if args.headless:
+    result = e.simulate(args.steps, draw_every=args.draw_every)
+    print(f"Ran {result['steps']} updates in {result['seconds']:.2f}s "
+          f"({result['updates_per_second']:.0f} updates per second)")
+    if e.profiler is not None:
+        e.profiler.print_report()
+        e.profiler.close()
+else:
+    e.run()
@@ -97,6 +97,7 @@ def place_tile(mouse_x, mouse_y):
     try:
         global field_one
         size = int(field_one.text)
+        # The map only re-renders the chunks these tiles fall in
         for yy in range(size):
             for xx in range(size):
                 area.map.set_tile(x + (xx*32), y + (yy*32), current_tile_index)
@@ -120,7 +121,7 @@ def place_entity(mouse_x, mouse_y):
     # If the position wasn't valid, the placeholder will delete itself.
     if e.has(EntityPlaceholder):
         from core.area import area
-        area.entities.append(e)
+        area.add_entity(e)
     
 
 def click_tool(mouse_x, mouse_y):
@@ -129,63 +130,62 @@ def click_tool(mouse_x, mouse_y):
     from core.camera import camera
     mouse_x += camera.x
     mouse_y += camera.y
-    for e in area.entities:
-        if e.has(Sprite):
-            sprite = e.get(Sprite)
-            # Figure out whether the mouse is in the sprite
-            if mouse_x > e.x and \
-                mouse_y > e.y and \
-                mouse_x < e.x + sprite.image.get_width() and \
-                mouse_y < e.y + sprite.image.get_height():
-                from components.editor import EntityPlaceholder
-                from data.objects import entity_factories
-                from core.camera import camera
+    for e in area.query(Sprite):
+        sprite = e.get(Sprite)
+        # Figure out whether the mouse is in the sprite
+        if mouse_x > e.x and \
+            mouse_y > e.y and \
+            mouse_x < e.x + sprite.image.get_width() and \
+            mouse_y < e.y + sprite.image.get_height():
+            from components.editor import EntityPlaceholder
+            from data.objects import entity_factories
+            from core.camera import camera
 
-                global selected_entity, fields
-                fields.clear()
-                selected_entity = e
-                placeholder = e.get(EntityPlaceholder)
-                id = placeholder.id
-                factory = entity_factories[id]
+            global selected_entity, fields
+            fields.clear()
+            selected_entity = e
+            placeholder = e.get(EntityPlaceholder)
+            id = placeholder.id
+            factory = entity_factories[id]
 
-                # Clear out Previous Tools
-                for tool in tool_entities:
-                    tool.delete_self()
-                tool_entities.clear()
+            # Clear out Previous Tools
+            for tool in tool_entities:
+                tool.delete_self()
+            tool_entities.clear()
 
-                # Title of Entity
-                field_label = Entity(Label("EBGaramond-Regular.ttf", 
-                                           factory.name + ": "),
-                             y=camera.height-50).get(Label)
-                tool_entities.append(field_label.entity)
+            # Title of Entity
+            field_label = Entity(Label("EBGaramond-Regular.ttf", 
+                                       factory.name + ": "),
+                         y=camera.height-50).get(Label)
+            tool_entities.append(field_label.entity)
                 
-                # Do all properties
-                x = field_label.get_bounds().width
-                for i, arg in enumerate(factory.arg_names):
-                    print(e.get(EntityPlaceholder).args)
-                    label = Entity(Label("EBGaramond-Regular.ttf", 
-                                           arg),
-                             x=x,
-                             y=camera.height-100).get(Label)
+            # Do all properties
+            x = field_label.get_bounds().width
+            for i, arg in enumerate(factory.arg_names):
+                print(e.get(EntityPlaceholder).args)
+                label = Entity(Label("EBGaramond-Regular.ttf", 
+                                       arg),
+                         x=x,
+                         y=camera.height-100).get(Label)
                     
-                    field = Entity(
-                        TextInput("EBGaramond-Regular.ttf", 
-                                  e.get(EntityPlaceholder).args[i], 
-                                  max_text=1,
-                                  width=200,
-                                  on_change=lambda: save_args()),
-                        x=x,
-                        y=camera.height-50
-                    ).get(TextInput)
-                    fields.append(field)
+                field = Entity(
+                    TextInput("EBGaramond-Regular.ttf", 
+                              e.get(EntityPlaceholder).args[i], 
+                              max_text=1,
+                              width=200,
+                              on_change=lambda: save_args()),
+                    x=x,
+                    y=camera.height-50
+                ).get(TextInput)
+                fields.append(field)
                     
-                    x += 220
-                    tool_entities.append(label.entity)
-                    tool_entities.append(field.entity)
+                x += 220
+                tool_entities.append(label.entity)
+                tool_entities.append(field.entity)
 
 
 
-                return # Once we find one, stop looking. Optimization
+            return # Once we find one, stop looking. Optimization
 
 def save_args():
     from components.editor import EntityPlaceholder
@@ -203,16 +203,15 @@ def delete_tool(mouse_x, mouse_y):
     from core.area import area
     mouse_x += camera.x
     mouse_y += camera.y
-    for e in area.entities:
-        if e.has(Sprite):
-            sprite = e.get(Sprite)
-            # Figure out whether the mouse is in the sprite
-            if mouse_x > e.x and \
-                mouse_y > e.y and \
-                mouse_x < e.x + sprite.image.get_width() and \
-                mouse_y < e.y + sprite.image.get_height():
-                e.delete_self()
-                return # Once we find one, stop looking. Optimization
+    for e in area.query(Sprite):
+        sprite = e.get(Sprite)
+        # Figure out whether the mouse is in the sprite
+        if mouse_x > e.x and \
+            mouse_y > e.y and \
+            mouse_x < e.x + sprite.image.get_width() and \
+            mouse_y < e.y + sprite.image.get_height():
+            e.delete_self()
+            return # Once we find one, stop looking. Optimization
 
 
 # ---- User Interface ----
@@ -11,7 +11,17 @@ def editor_press():
 
 def new_game():
     from core.engine import engine
+    from core import world_state
+    # Start over, forgetting what was changed in the last game
+    world_state.clear()
     engine.switch_to("Play")
+    # Only import the player once there is an area, it keeps a reference to it
+    from components.player import inventory
+    inventory.clear()
+
+def load_game():
+    from core.engine import engine
+    engine.switch_to("LoadGame")
 
 def quit_game():
     from core.engine import engine
@@ -20,6 +30,10 @@ def quit_game():
 def menu():
     Entity(Sprite("main_menu.png", is_ui=True))
 
+    # Start loading the NPC agents while the player is looking at the menu
+    from components.npc import preload_agent_stack
+    preload_agent_stack()
+
     new_game_button = Entity(Label("EBGaramond-Regular.ttf", 
                                          "New Game", 80,
                                          (255, 255, 0)))
@@ -44,4 +58,17 @@ def menu():
     editor_button.x = camera.width/2 - new_button_size.width/2
     editor_button.y = camera.height - 350
     quit_game_button.x = camera.width/2 - quit_button_size.width/2
-    quit_game_button.y = camera.height - 200
\ No newline at end of file
+    quit_game_button.y = camera.height - 200
+
+    from core.save_game import has_save
+    if has_save():
+        load_game_button = Entity(Label("EBGaramond-Regular.ttf", 
+                                        "Load Game", 80,
+                                        (255, 255, 0)))
+        load_button_size = load_game_button.get(Label).get_bounds()
+        load_game_button.add(Button(load_game, load_button_size))
+        load_game_button.x = camera.width/2 - load_button_size.width/2
+        load_game_button.y = camera.height - 440
+        # Make room for it
+        new_game_button.y = camera.height - 560
+        editor_button.y = camera.height - 320
\ No newline at end of file